@@ -16,35 +16,225 @@ import os
 import sys
 import json
 import base64
+import hashlib
+import io
+import re
 from datetime import datetime
-import requests
 from pathlib import Path
 import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Static instructions sent as the first system block on every analysis call.
+# At ~300 tokens this alone is below the API's minimum cacheable prefix
+# (1024 tokens for Sonnet), so it is only cached together with the principles
+ANALYSIS_SYSTEM_PROMPT = """You are analyzing a screenshot of the Chonker3 PDF extraction application.
+
+Please analyze the screenshot and provide:
+1. What's working well in the current implementation
+2. Specific issues or improvements needed (focus on visual rendering, text extraction quality, UI/UX)
+3. Concrete code changes to implement (be specific about files and line numbers if possible)
+
+The main source file is at src/main.rs. Focus on practical improvements that will make the extracted content more readable and accurate.
+
+Important context:
+- The left panel shows the original PDF
+- The right panel shows the extracted and rendered content
+- We want the extracted content to closely match the PDF layout
+- Text should be properly positioned and styled
+- Forms, tables, and special formatting should be preserved
+
+Please provide your analysis in JSON format:
+{
+  "working_well": ["list of things working well"],
+  "issues": ["list of specific issues"],
+  "improvements": [
+    {
+      "description": "what to improve",
+      "file": "which file to modify",
+      "changes": "specific code changes to make"
+    }
+  ],
+  "overall_score": 0-10
+}
+
+IMPORTANT: Your response must be ONLY the JSON object, no other text."""
+
+# Claude downsizes images past this edge length anyway, so don't upload more
+MAX_IMAGE_EDGE = 1568
+
+# Instructions for folding a new analysis into the running principles file
+PRINCIPLES_SYSTEM_PROMPT = """Update the principles file. Deduplicate. Abstract episodic feedback into rules.
+
+You will receive the current principles file (Markdown, possibly empty) followed by the latest
+improvement suggestions for the Chonker3 PDF extraction application. Merge the new suggestions
+into the file, dropping anything already covered and generalizing one-off fixes into reusable
+rules. Keep it short.
+
+IMPORTANT: Your response must be ONLY the updated Markdown file, no other text."""
+
+# Marker echoed by the osascript worker after each script so we know its output is complete
+OSA_DONE = "__chonker_osa_done__"
+
+def json_dumps(obj, indent=False):
+    """Serialize obj to a JSON string, with orjson when available"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(obj, indent=2 if indent else None)
+
+def json_loads(text):
+    """Parse a JSON string, with orjson when available"""
+    if HAS_ORJSON:
+        return orjson.loads(text.encode())
+    return json.loads(text)
 
 class ChonkerAutomation:
-    def __init__(self, pdf_path=None):
+    def __init__(self, pdf_path=None, batch_size=1):
         self.project_dir = Path("/Users/jack/chonker3-new")
         self.pdf_path = pdf_path or "/Users/jack/Downloads/righttoknowrequestresultsfortieriidataon4southwes/split_pages/page_0001.pdf"
         self.screenshot_dir = self.project_dir / "automation_screenshots"
         self.iteration_count = 0
         self.max_iterations = 5
+        # Screenshots sent together in one analysis request
+        self.batch_size = max(1, batch_size)
+        self.pending_screenshots = []
+        # Background worker that builds the next iteration while Claude analyzes
+        self._build_executor = ThreadPoolExecutor(max_workers=1)
+        self._prebuild = None
+        # Lightweight per-iteration summaries; full analyses live in the JSONL log
         self.results_log = []
+        # Hashes of the previous iteration's improvement descriptions
+        self._last_hashes = None
         
         # Create screenshot directory
         self.screenshot_dir.mkdir(exist_ok=True)
         
-        # Claude API endpoint (using local completion)
+        # Deduplicated principles distilled from earlier iterations
+        self.memory_file = self.project_dir / "memories" / "principles.md"
+        self.memory_file.parent.mkdir(exist_ok=True)
+        
+        # Append-only log of every analysis, one JSON record per line
+        self.jsonl_path = self.project_dir / f"improvements_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        self.jsonl = open(self.jsonl_path, "a", buffering=1)
+        
+        # Every capture lands on the same scratch file and is only linked to
+        # an archival name once it has been analyzed
+        self.scratch_path = self.screenshot_dir / "scratch.png"
+        
+        # Claude API endpoints (using local completion)
         self.claude_api_url = "https://api.anthropic.com/v1/messages"
+        self.claude_files_url = "https://api.anthropic.com/v1/files"
+        self.claude_model = "claude-3-5-sonnet-20241022"
+        
+        # Keep-alive session so only the first analysis pays for the TLS handshake.
+        # Content-Type is left to requests so JSON and multipart calls both work.
+        # requests is imported here so argument errors exit without loading it.
+        import requests
+        self.http = requests.Session()
+        self.http.headers.update({
+            "x-api-key": os.environ.get("ANTHROPIC_API_KEY", ""),
+            "anthropic-version": "2023-06-01",
+            "anthropic-beta": "files-api-2025-04-14"
+        })
+        
+        # Long-lived osascript REPL so each UI command skips process spawn
+        # and AppleEvents setup
+        self.osa = subprocess.Popen(
+            ["osascript", "-i"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        
+        # Window bounds for screencapture -R, looked up on first capture
+        self._window_rect = None
+        
+        # chonker3 touches this file when an extraction finishes
+        self.extract_done_path = Path.home() / ".chonker3" / "last_extract_done"
+        
+        # UI script: compiled to .scpt bytecode once (in the background while
+        # the first build runs) and given the PDF path as an argument
+        self.ui_script_source = self.project_dir / "scripts" / "drive.applescript"
+        self.ui_script_path = self.ui_script_source.with_suffix(".scpt")
+        self._ui_compile = None
+        if (not self.ui_script_path.exists()
+                or self.ui_script_path.stat().st_mtime_ns < self.ui_script_source.stat().st_mtime_ns):
+            self._ui_compile = subprocess.Popen(
+                ["osacompile", "-o", str(self.ui_script_path), str(self.ui_script_source)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        
+    def _osa(self, script):
+        """Run AppleScript on the persistent worker.
+        
+        Returns (result, errors): the value of the last statement and any
+        error lines the worker printed while running the script.
+        """
+        self.osa.stdin.write(script.strip() + f'\n"{OSA_DONE}"\n')
+        self.osa.stdin.flush()
         
+        result = ""
+        errors = []
+        for line in self.osa.stdout:
+            line = line.strip().lstrip("?>").strip()
+            if not line:
+                continue
+            if OSA_DONE in line:
+                break
+            if line.startswith("=>"):
+                result = line[2:].strip()
+            else:
+                errors.append(line)
+        return result, errors
+    
+    def window_rect(self):
+        """Return the chonker3 window bounds as "x,y,w,h", queried once per run"""
+        if self._window_rect is None:
+            result, errors = self._osa(
+                'tell application "System Events" to tell process "chonker3" '
+                'to get {position, size} of window 1'
+            )
+            numbers = re.findall(r"-?\d+", result)
+            if errors or len(numbers) != 4:
+                return None
+            self._window_rect = ",".join(numbers)
+        return self._window_rect
+    
+    def _src_fingerprint(self):
+        """Newest mtime (ns) across the inputs that affect the release binary"""
+        paths = list((self.project_dir / "src").rglob("*.rs"))
+        for name in ("build.rs", "Cargo.toml", "Cargo.lock"):
+            path = self.project_dir / name
+            if path.exists():
+                paths.append(path)
+        return max((p.stat().st_mtime_ns for p in paths), default=0)
+    
     def build_app(self):
         """Build the Rust application"""
+        binary = self.project_dir / "target" / "release" / "chonker3"
+        if binary.exists() and binary.stat().st_mtime_ns > self._src_fingerprint():
+            print("✅ Build up to date, skipping cargo")
+            return True
+        
         print("🔨 Building Chonker3...")
+        env = os.environ.copy()
+        if shutil.which("sccache"):
+            env.setdefault("RUSTC_WRAPPER", "sccache")
         result = subprocess.run(
             ["cargo", "build", "--release"],
             cwd=self.project_dir,
             capture_output=True,
-            text=True
+            text=True,
+            env=env
         )
         if result.returncode != 0:
             print(f"Build failed: {result.stderr}")
@@ -57,12 +247,22 @@ class ChonkerAutomation:
         self.iteration_count += 1
         print(f"\n🔄 Starting iteration {self.iteration_count}")
         
-        # Build the app
+        # Build the app. A prebuild started during the last analysis usually
+        # leaves this a no-op; build_app still catches any later source edits.
+        if self._prebuild is not None:
+            self._prebuild.result()
+            self._prebuild = None
         if not self.build_app():
             return False
         
         # Run the app and automate interaction
-        screenshot_path = self.screenshot_dir / f"iteration_{self.iteration_count}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+        screenshot_path = self.scratch_path
+        if screenshot_path.exists():
+            screenshot_path.unlink()
+        
+        # Clear the readiness sentinel left over from the previous run
+        if self.extract_done_path.exists():
+            self.extract_done_path.unlink()
         
         print("🚀 Starting Chonker3...")
         process = subprocess.Popen(
@@ -72,77 +272,35 @@ class ChonkerAutomation:
             stderr=subprocess.PIPE
         )
         
-        # Give it time to start
-        time.sleep(3)
-        
-        # Use AppleScript to control the app
-        applescript = f'''
-        tell application "System Events"
-            -- Wait for chonker3 window
-            repeat 10 times
-                if exists (window 1 of process "chonker3") then
-                    exit repeat
-                end if
-                delay 0.5
-            end repeat
-            
-            -- Make chonker3 frontmost
-            tell process "chonker3"
-                set frontmost to true
-                delay 0.5
-                
-                -- Click Open button
-                click button "Open" of window 1
-                delay 1
-            end tell
-        end tell
-        
-        -- Handle file dialog
-        tell application "System Events"
-            keystroke "g" using {{shift down, command down}}
-            delay 0.5
-            keystroke "{self.pdf_path}"
-            delay 0.5
-            keystroke return
-            delay 0.5
-            keystroke return
-            delay 2
-            
-            -- Click Extract button
-            tell process "chonker3"
-                click button "Extract" of window 1
-            end tell
-            
-            -- Wait for extraction to complete
-            delay 8
-        end tell
-        '''
-        
+        # No startup sleep: the UI script itself polls for the window
         print("🤖 Automating UI interaction...")
-        result = subprocess.run(['osascript', '-e', applescript], 
-                              capture_output=True, text=True)
+        script = self.ui_script_path
+        if self._ui_compile is not None and self._ui_compile.wait() != 0:
+            # run script can still compile the source itself
+            script = self.ui_script_source
+        _, errors = self._osa(
+            f'run script (POSIX file "{script}") '
+            f'with parameters {{"{self.pdf_path}", "{self.extract_done_path}"}}'
+        )
         
-        if result.returncode != 0:
-            print(f"⚠️  AppleScript warning: {result.stderr}")
+        if errors:
+            print(f"⚠️  AppleScript warning: {' '.join(errors)}")
         
         # Take screenshot of the window
         print("📸 Taking screenshot...")
-        # First get the window ID
-        window_id_script = 'tell app "chonker3" to id of window 1'
         try:
-            window_id_result = subprocess.run(['osascript', '-e', window_id_script], 
-                                            capture_output=True, text=True)
-            if window_id_result.returncode == 0:
-                window_id = window_id_result.stdout.strip()
-                # Take screenshot of specific window
-                subprocess.run(['screencapture', '-l', window_id, str(screenshot_path)])
+            rect = self.window_rect()
+            if rect:
+                # Capture the window's rectangle directly: no sound, no shadow,
+                # no window-list lookup
+                subprocess.run(['screencapture', '-x', '-o', '-t', 'png', '-R', rect, str(screenshot_path)],
+                               check=True)
             else:
-                # Fallback to window capture
-                subprocess.run(['screencapture', '-w', str(screenshot_path)])
-                time.sleep(1)  # Give user time to click
-        except:
-            # Final fallback
-            subprocess.run(['screencapture', '-i', str(screenshot_path)])
+                print("⚠️  Could not read chonker3 window bounds")
+        except (subprocess.SubprocessError, OSError) as e:
+            # No interactive fallback: nobody is there to click, so just fail
+            # this cycle (the missing screenshot is caught below)
+            print(f"⚠️  Screenshot capture failed: {e}")
         
         time.sleep(1)
         
@@ -156,81 +314,128 @@ class ChonkerAutomation:
             print("❌ Screenshot failed")
             return False
             
-        print(f"✅ Screenshot saved: {screenshot_path}")
+        print(f"✅ Screenshot captured: {screenshot_path}")
         return str(screenshot_path)
     
-    def analyze_with_claude(self, screenshot_path):
-        """Send screenshot to Claude for analysis"""
+    def archive_screenshot(self):
+        """Hardlink the scratch capture to a per-iteration archival name"""
+        archival_path = self.screenshot_dir / f"iteration_{self.iteration_count}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+        if archival_path.exists():
+            archival_path.unlink()
+        os.link(self.scratch_path, archival_path)
+        print(f"✅ Screenshot saved: {archival_path}")
+        return str(archival_path)
+    
+    def prepare_screenshot(self, screenshot_path):
+        """Downsample to Claude's effective resolution and recompress as JPEG"""
+        from PIL import Image
+        
+        buf = io.BytesIO()
+        with Image.open(screenshot_path) as im:
+            im.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
+            im.convert("RGB").save(buf, "JPEG", quality=85, optimize=True)
+        return buf.getvalue()
+    
+    def upload_screenshot(self, image_bytes):
+        """Upload the image through the Files API and return its file id"""
+        import requests
+        
+        try:
+            response = self.http.post(
+                self.claude_files_url,
+                files={"file": (f"iteration_{self.iteration_count}.jpg", image_bytes, "image/jpeg")}
+            )
+            if response.status_code != 200:
+                print(f"⚠️  File upload failed: {response.status_code} - {response.text}")
+                return None
+            return response.json().get("id")
+        except requests.RequestException as e:
+            print(f"⚠️  File upload failed: {e}")
+            return None
+    
+    def delete_upload(self, file_id):
+        """Delete an uploaded screenshot once it has been analyzed"""
+        import requests
+        
+        try:
+            response = self.http.delete(f"{self.claude_files_url}/{file_id}")
+            if response.status_code != 200:
+                print(f"⚠️  File delete failed: {response.status_code} - {response.text}")
+        except requests.RequestException as e:
+            print(f"⚠️  File delete failed: {e}")
+    
+    def encode_screenshot(self, image_bytes):
+        """Base64-encode the image for an inline image block"""
+        return base64.b64encode(image_bytes).decode("ascii")
+    
+    def image_block(self, screenshot_path):
+        """Build the image content block for one screenshot"""
+        image_bytes = self.prepare_screenshot(screenshot_path)
+        
+        # Prefer sending the image as raw multipart bytes via the Files API;
+        # fall back to an inline base64 block if the upload is rejected
+        file_id = self.upload_screenshot(image_bytes)
+        if file_id:
+            image_source = {"type": "file", "file_id": file_id}
+        else:
+            image_source = {
+                "type": "base64",
+                "media_type": "image/jpeg",
+                "data": self.encode_screenshot(image_bytes)
+            }
+        return {"type": "image", "source": image_source}
+    
+    def analyze_with_claude(self, screenshot_paths):
+        """Send one or more screenshots (oldest first) to Claude for analysis"""
         print("🤔 Analyzing with Claude...")
         
-        # Read and encode the screenshot
-        with open(screenshot_path, "rb") as f:
-            image_data = base64.b64encode(f.read()).decode()
+        content = [self.image_block(path) for path in screenshot_paths]
+        file_ids = [block["source"]["file_id"] for block in content
+                    if block["source"]["type"] == "file"]
         
-        # Prepare the prompt
-        prompt = f"""You are analyzing a screenshot of the Chonker3 PDF extraction application.
-
-This is iteration {self.iteration_count} of an automated development loop.
-
-Please analyze the screenshot and provide:
-1. What's working well in the current implementation
-2. Specific issues or improvements needed (focus on visual rendering, text extraction quality, UI/UX)
-3. Concrete code changes to implement (be specific about files and line numbers if possible)
-
-The main source file is at src/main.rs. Focus on practical improvements that will make the extracted content more readable and accurate.
-
-Important context:
-- The left panel shows the original PDF
-- The right panel shows the extracted and rendered content
-- We want the extracted content to closely match the PDF layout
-- Text should be properly positioned and styled
-- Forms, tables, and special formatting should be preserved
-
-Please provide your analysis in JSON format:
-{{
-  "working_well": ["list of things working well"],
-  "issues": ["list of specific issues"],
-  "improvements": [
-    {{
-      "description": "what to improve",
-      "file": "which file to modify",
-      "changes": "specific code changes to make"
-    }}
-  ],
-  "overall_score": 0-10
-}}
-
-IMPORTANT: Your response must be ONLY the JSON object, no other text."""
+        # Per-iteration part of the prompt; the static instructions live in
+        # ANALYSIS_SYSTEM_PROMPT so they can be served from the prompt cache
+        if len(screenshot_paths) == 1:
+            prompt = f"This is iteration {self.iteration_count} of an automated development loop."
+        else:
+            first = self.iteration_count - len(screenshot_paths) + 1
+            prompt = (f"These are screenshots from iterations {first}-{self.iteration_count} of an "
+                      f"automated development loop, oldest first. Compare them, note what changed "
+                      f"between iterations, and base the JSON analysis on the latest one.")
+        content.append({"type": "text", "text": prompt})
 
+        system = [
+            {
+                "type": "text",
+                "text": ANALYSIS_SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"}
+            }
+        ]
+        
+        # Attach what earlier iterations taught us, compact and cacheable.
+        # Caching only kicks in once principles.md has grown enough for the
+        # two blocks to pass the minimum prefix; until then the cache log
+        # below reports 0 read, 0 written
+        principles = self.read_principles()
+        if principles:
+            system.append({
+                "type": "text",
+                "text": f"Principles learned in earlier iterations:\n\n{principles}",
+                "cache_control": {"type": "ephemeral"}
+            })
+        
         try:
             # Make API call to Claude
-            response = requests.post(
+            response = self.http.post(
                 self.claude_api_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "x-api-key": os.environ.get("ANTHROPIC_API_KEY", ""),
-                    "anthropic-version": "2023-06-01"
-                },
                 json={
-                    "model": "claude-3-5-sonnet-20241022",
+                    "model": self.claude_model,
                     "max_tokens": 2000,
+                    "system": system,
                     "messages": [
                         {
                             "role": "user",
-                            "content": [
-                                {
-                                    "type": "image",
-                                    "source": {
-                                        "type": "base64",
-                                        "media_type": "image/png",
-                                        "data": image_data
-                                    }
-                                },
-                                {
-                                    "type": "text",
-                                    "text": prompt
-                                }
-                            ]
+                            "content": content
                         }
                     ]
                 }
@@ -242,11 +447,14 @@ IMPORTANT: Your response must be ONLY the JSON object, no other text."""
                 
             # Parse response
             api_response = response.json()
+            usage = api_response.get("usage", {})
+            print(f"🗄️  Prompt cache: {usage.get('cache_read_input_tokens', 0)} read, "
+                  f"{usage.get('cache_creation_input_tokens', 0)} written")
             content = api_response.get("content", [{}])[0].get("text", "{}")
             
             # Try to parse JSON from the response
             try:
-                analysis = json.loads(content)
+                analysis = json_loads(content)
                 return analysis
             except json.JSONDecodeError:
                 print(f"❌ Failed to parse Claude's response as JSON: {content}")
@@ -255,6 +463,10 @@ IMPORTANT: Your response must be ONLY the JSON object, no other text."""
         except Exception as e:
             print(f"❌ Error calling Claude API: {e}")
             return None
+        finally:
+            # Uploads are only needed for this request; don't let them pile up
+            for file_id in file_ids:
+                self.delete_upload(file_id)
     
     def apply_improvements(self, analysis):
         """Apply the suggested improvements"""
@@ -267,21 +479,57 @@ IMPORTANT: Your response must be ONLY the JSON object, no other text."""
             print(f"  - {improvement['description']}")
             
             # Here you would implement the actual code changes
-            # For now, we'll just log them
-            self.results_log.append({
-                "iteration": self.iteration_count,
-                "improvement": improvement,
-                "timestamp": datetime.now().isoformat()
-            })
-        
-        # Save improvements to a file for manual review
-        improvements_file = self.project_dir / f"improvements_iteration_{self.iteration_count}.json"
-        with open(improvements_file, "w") as f:
-            json.dump(analysis, f, indent=2)
+            # For now, the analysis is only recorded in the JSONL log
         
-        print(f"💾 Improvements saved to: {improvements_file}")
+        print(f"💾 Improvements logged to: {self.jsonl_path}")
         return True
     
+    def read_principles(self):
+        """Return the current principles file, or an empty string"""
+        if not self.memory_file.exists():
+            return ""
+        return self.memory_file.read_text().strip()
+    
+    def update_principles(self, analysis):
+        """Ask Claude to merge this iteration's improvements into principles.md"""
+        import requests
+        
+        print("🧠 Updating principles...")
+        old_principles = self.read_principles() or "(empty)"
+        new_improvements = json_dumps(analysis.get("improvements", []), indent=True)
+        
+        try:
+            response = self.http.post(
+                self.claude_api_url,
+                json={
+                    "model": self.claude_model,
+                    "max_tokens": 1000,
+                    "system": PRINCIPLES_SYSTEM_PROMPT,
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": f"Current principles file:\n\n{old_principles}\n\n"
+                                       f"New improvements from iteration {self.iteration_count}:\n\n{new_improvements}"
+                        }
+                    ]
+                }
+            )
+            
+            if response.status_code != 200:
+                print(f"❌ Claude API error: {response.status_code} - {response.text}")
+                return False
+            
+            content = response.json().get("content", [{}])[0].get("text", "")
+            if not content.strip():
+                return False
+            self.memory_file.write_text(content.strip() + "\n")
+            print(f"💾 Principles saved to: {self.memory_file}")
+            return True
+        
+        except requests.RequestException as e:
+            print(f"❌ Error calling Claude API: {e}")
+            return False
+    
     def run_automated_loop(self):
         """Run the complete automated development loop"""
         print("🚀 Starting Automated Development Loop for Chonker3")
@@ -302,16 +550,38 @@ IMPORTANT: Your response must be ONLY the JSON object, no other text."""
             
             # Analyze with Claude (if API key is available)
             if os.environ.get("ANTHROPIC_API_KEY"):
-                analysis = self.analyze_with_claude(screenshot)
+                if self.batch_size > 1:
+                    # scratch.png is overwritten every cycle, so batched
+                    # captures are archived straight away
+                    screenshot = self.archive_screenshot()
+                self.pending_screenshots.append(screenshot)
+                if (len(self.pending_screenshots) < self.batch_size
+                        and self.iteration_count < self.max_iterations):
+                    print(f"🗂️  Batched screenshot {len(self.pending_screenshots)}/{self.batch_size}")
+                    continue
+                
+                # Claude is slow and I/O-bound: build the next iteration meanwhile
+                if self.iteration_count < self.max_iterations:
+                    self._prebuild = self._build_executor.submit(self.build_app)
+                
+                analysis = self.analyze_with_claude(self.pending_screenshots)
+                self.pending_screenshots = []
                 if analysis:
                     print(f"📊 Overall score: {analysis.get('overall_score', 'N/A')}/10")
+                    if self.batch_size == 1:
+                        screenshot = self.archive_screenshot()
                     
                     # Log results
-                    self.results_log.append({
+                    self.jsonl.write(json_dumps({
                         "iteration": self.iteration_count,
                         "screenshot": screenshot,
                         "analysis": analysis,
                         "timestamp": datetime.now().isoformat()
+                    }) + "\n")
+                    self.results_log.append({
+                        "iteration": self.iteration_count,
+                        "score": analysis.get("overall_score"),
+                        "screenshot": screenshot
                     })
                     
                     # Check if we've reached a good score
@@ -319,12 +589,24 @@ IMPORTANT: Your response must be ONLY the JSON object, no other text."""
                         print("🎉 Achieved high quality score! Stopping iterations.")
                         break
                     
-                    # Apply improvements
-                    self.apply_improvements(analysis)
+                    # Stop once Claude only repeats suggestions from the previous iteration
+                    hashes = frozenset(
+                        hashlib.sha1(imp.get("description", "").encode()).hexdigest()
+                        for imp in analysis.get("improvements", [])
+                    )
+                    if self._last_hashes is not None and hashes <= self._last_hashes:
+                        print("🟰 Converged — no new improvements. Stopping iterations.")
+                        break
+                    self._last_hashes = hashes
+                    
+                    # Apply improvements and fold them into the principles file
+                    if self.apply_improvements(analysis):
+                        self.update_principles(analysis)
                 else:
                     print("⚠️  Skipping improvements due to analysis failure")
             else:
                 print("⏭️  Skipping Claude analysis (no API key)")
+                self.archive_screenshot()
             
             # Wait before next iteration
             if self.iteration_count < self.max_iterations:
@@ -336,16 +618,24 @@ IMPORTANT: Your response must be ONLY the JSON object, no other text."""
         print("✅ Automation complete!")
     
     def save_results(self):
-        """Save all results to a summary file"""
+        """Save a run manifest pointing at the improvements log"""
         summary_file = self.project_dir / f"automation_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         with open(summary_file, "w") as f:
-            json.dump({
+            f.write(json_dumps({
                 "total_iterations": self.iteration_count,
                 "pdf_path": str(self.pdf_path),
+                "improvements_log": str(self.jsonl_path),
                 "results": self.results_log
-            }, f, indent=2)
+            }, indent=True))
         print(f"📊 Summary saved to: {summary_file}")
         
+        # Shut down the osascript worker and the API connection pool
+        self.osa.stdin.close()
+        self.osa.wait()
+        self.http.close()
+        self.jsonl.close()
+        self._build_executor.shutdown(wait=True)
+        
         # Open the screenshots directory
         subprocess.run(["open", str(self.screenshot_dir)])
 
@@ -359,7 +649,15 @@ def main():
             sys.exit(1)
     
     # Create and run automation
-    automation = ChonkerAutomation(pdf_path)
+    raw_batch_size = os.environ.get("CHONKER_BATCH_SIZE", "1")
+    try:
+        batch_size = int(raw_batch_size)
+    except ValueError:
+        batch_size = 0
+    if batch_size < 1:
+        print(f"❌ CHONKER_BATCH_SIZE must be an integer of at least 1, got: {raw_batch_size!r}")
+        sys.exit(1)
+    automation = ChonkerAutomation(pdf_path, batch_size=batch_size)
     
     try:
         automation.run_automated_loop()
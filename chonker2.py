@@ -4,22 +4,176 @@ Chonker2 - PDF to JSON extractor using Docling
 Extracts content with precise spatial information for rendering in Snyfter
 """
 
+import os
+import re
 import sys
 import json
 import hashlib
 import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import logging
 
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
 try:
-    from docling.document_converter import DocumentConverter
-    DOCLING_AVAILABLE = True
+    from blake3 import blake3 as _content_hasher
 except ImportError:
-    DOCLING_AVAILABLE = False
-    print("Error: Docling not available. Install with: pip install docling")
-    sys.exit(1)
+    def _content_hasher():
+        return hashlib.blake2b(digest_size=8)
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _json_bytes(obj: Any) -> bytes:
+    """Serialize obj to compact UTF-8 JSON, with orjson when available"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+# Form detection patterns
+CHECKBOX_MARKS = frozenset(['[ ]', '[X]', '[x]', '☐', '☑', '□', '■', '▢', '▣'])
+CHECKED_MARKS = frozenset(['[X]', '[x]', '☑', '■', '▣'])
+UNDERLINE_CHARS = frozenset('_-')
+FORM_FIELD_RE = re.compile(
+    r'name:|date:|address:|phone:|email:|signature:|id:|no\.|number:|title:|ssn:|dob:|zip:',
+    re.IGNORECASE
+)
+
+# Style attributes copied into item styles: (source attribute, key, converter)
+STYLE_FIELDS = (
+    ('font_name', 'font', str),
+    ('font_size', 'font_size', float),
+    ('bold', 'bold', bool),
+    ('italic', 'italic', bool),
+)
+TEXT_STYLE_FIELDS = (
+    ('is_bold', 'bold', bool),
+    ('is_italic', 'italic', bool),
+    ('font_size', 'font_size', float),
+)
+
+# Prototype for per-item records; copying it skips rebuilding the key table
+_ITEM_TEMPLATE = {
+    'index': 0,
+    'type': '',
+    'level': 0,
+    'content': '',
+    'bbox': None,
+    'page': 0,
+    'confidence': 1.0,
+    'attributes': None
+}
+
+# Optional item attributes _extract_item_data reads, probed once per item type
+PROBED_ATTRIBUTES = ('confidence', 'text', 'caption', 'prov', 'style', 'text_style')
+
+# Table cell attributes read by _extract_table_data (old and new Docling names)
+CELL_FIELDS = (
+    'row', 'col', 'start_row_offset_idx', 'start_col_offset_idx', 'text',
+    'rowspan', 'row_span', 'colspan', 'col_span', 'bbox', 'column_header'
+)
+
+# US Letter in points, used when a page's size is unknown
+DEFAULT_PAGE_DIMS = (612.0, 792.0)
+
+# Sentinel for attribute probes where None is a legitimate value
+_MISSING = object()
+
+
+def _copy_style_fields(style: Any, fields, style_info: Dict[str, Any]):
+    """Copy whichever of fields exist on style into style_info"""
+    for attr, key, convert in fields:
+        value = getattr(style, attr, _MISSING)
+        if value is not _MISSING:
+            style_info[key] = convert(value)
+
+# Column / reading-order detection parameters
+COLUMN_GAP_THRESHOLD = 50.0  # Minimum gap to consider as column boundary
+ROW_HEIGHT_ESTIMATE = 20.0  # Approximate line height for row bands
+
+
+def _assign_columns_bands_numpy(lefts, tops, threshold, row_height):
+    """Detect columns on one page and compute reading order
+    
+    Returns (gap_mids, columns, row_bands, reading_order); columns is -1 for
+    items left of both x=0 and the first gap, and reading_order is each item's position when sorted
+    by row band, then column.
+    """
+    n = lefts.shape[0]
+    
+    # Find gaps between x-positions to identify column boundaries
+    x_positions = np.sort(lefts)
+    gap_sizes = np.diff(x_positions)
+    gap_idx = np.flatnonzero(gap_sizes > threshold)
+    gap_mids = x_positions[gap_idx] + gap_sizes[gap_idx] / 2
+    
+    # Assign items to columns
+    column_boundaries = np.concatenate(([0.0], gap_mids, [np.inf]))
+    columns = np.searchsorted(column_boundaries, lefts, side='right') - 1
+    
+    # Stable sort by row band first, then by column
+    row_bands = (tops / row_height).astype(np.int64)
+    order = np.lexsort((np.maximum(columns, 0), row_bands))
+    reading_order = np.empty(n, dtype=np.int64)
+    reading_order[order] = np.arange(n)
+    
+    return gap_mids, columns, row_bands, reading_order
+
+
+def _assign_columns_bands_loop(lefts, tops, threshold, row_height):
+    """Single-pass equivalent of _assign_columns_bands_numpy for Numba"""
+    n = lefts.shape[0]
+    by_x = np.argsort(lefts, kind='mergesort')
+    
+    # Walk items left to right; each gap over the threshold starts a new column
+    gap_mids = np.empty(max(n - 1, 0), dtype=np.float64)
+    columns = np.empty(n, dtype=np.int64)
+    n_gaps = 0
+    for k in range(n):
+        i = by_x[k]
+        if k > 0:
+            prev = lefts[by_x[k - 1]]
+            gap = lefts[i] - prev
+            if gap > threshold:
+                gap_mids[n_gaps] = prev + gap / 2
+                n_gaps += 1
+        # Same buckets as [0, *gap_mids, inf]: only items left of both x=0
+        # and the first gap fall outside every column
+        columns[i] = -1 if n_gaps == 0 and lefts[i] < 0.0 else n_gaps
+    
+    # Composite (row band, column) key; mergesort keeps ties in document order
+    row_bands = np.empty(n, dtype=np.int64)
+    keys = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        row_bands[i] = np.int64(tops[i] / row_height)
+        keys[i] = row_bands[i] * (n_gaps + 1) + max(columns[i], 0)
+    order = np.argsort(keys, kind='mergesort')
+    reading_order = np.empty(n, dtype=np.int64)
+    for k in range(n):
+        reading_order[order[k]] = k
+    
+    return gap_mids[:n_gaps], columns, row_bands, reading_order
+
+
+if HAS_NUMBA:
+    _assign_columns_bands = njit(cache=True)(_assign_columns_bands_loop)
+else:
+    _assign_columns_bands = _assign_columns_bands_numpy
 
 
 class Chonker2:
@@ -27,8 +181,19 @@ class Chonker2:
     
     def __init__(self, verbose: bool = False):
         self.verbose = verbose
+        # Constructor arguments, so batch workers can rebuild an equivalent extractor
+        self._init_kwargs = {'verbose': verbose}
         self.setup_logging()
-        self._init_docling()
+        # Docling and its models load on first use, see the converter property
+        self._converter = None
+        # Item type -> (attributes it carries, type-specific handler)
+        self._type_profiles = {}
+        # Page number -> (width, height) for the document being extracted
+        self._page_dims = {}
+        
+        # Compile the column kernel now rather than on the first page
+        if HAS_NUMBA:
+            _assign_columns_bands(np.zeros(2), np.zeros(2), COLUMN_GAP_THRESHOLD, ROW_HEIGHT_ESTIMATE)
     
     def setup_logging(self):
         """Configure logging"""
@@ -39,8 +204,25 @@ class Chonker2:
         )
         self.logger = logging.getLogger(__name__)
     
+    @property
+    def converter(self):
+        """Docling converter, created on first access"""
+        if self._converter is None:
+            self._init_docling()
+        return self._converter
+    
+    @converter.setter
+    def converter(self, value):
+        self._converter = value
+    
     def _init_docling(self):
         """Initialize Docling converter with optimized settings"""
+        try:
+            from docling.document_converter import DocumentConverter
+        except ImportError:
+            print("Error: Docling not available. Install with: pip install docling")
+            sys.exit(1)
+        
         try:
             from docling.datamodel.base_models import InputFormat
             from docling.datamodel.pipeline_options import (
@@ -76,13 +258,15 @@ class Chonker2:
             self.logger.error(f"Failed to initialize Docling: {e}")
             raise
     
-    def extract_to_json(self, pdf_path: str, output_path: Optional[str] = None) -> Dict[str, Any]:
+    def extract_to_json(self, pdf_path: str, output_path: Optional[str] = None,
+                        force: bool = False) -> Dict[str, Any]:
         """
         Extract PDF content to structured JSON
         
         Args:
             pdf_path: Path to input PDF
             output_path: Optional path for JSON output (defaults to pdf_name.json)
+            force: Re-extract even if an up-to-date JSON output already exists
             
         Returns:
             Dictionary containing extracted document data
@@ -91,140 +275,279 @@ class Chonker2:
         if not pdf_path.exists():
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
         
+        output_file = self._output_file(pdf_path, output_path)
+        cached = self._load_if_current(pdf_path, output_file, force)
+        if cached is not None:
+            return cached
+        
         self.logger.info(f"Processing: {pdf_path}")
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         
         try:
-            # Convert document
-            result = self.converter.convert(str(pdf_path))
-            
-            # Build document structure
-            document_data = {
-                'metadata': {
-                    'source_file': str(pdf_path),
-                    'file_name': pdf_path.name,
-                    'document_id': self._generate_document_id(str(pdf_path)),
-                    'extraction_timestamp': datetime.now().isoformat(),
-                    'processing_time': 0,  # Will update at end
-                    'docling_version': getattr(DocumentConverter, '__version__', 'unknown')
-                },
-                'pages': [],
-                'items': [],
-                'tables': []
-            }
-            
-            # Extract page information if available
-            if hasattr(result.document, 'pages') and result.document.pages:
-                for page_idx, page in enumerate(result.document.pages):
-                    # Debug what attributes the page has
-                    if page_idx == 0:
-                        self.logger.debug(f"Page attributes: {[attr for attr in dir(page) if not attr.startswith('_')]}")
-                    
-                    # Try different attribute names
-                    width = getattr(page, 'width', None) or getattr(page, 'size', {}).get('width', 612.0)
-                    height = getattr(page, 'height', None) or getattr(page, 'size', {}).get('height', 792.0)
-                    
-                    # Ensure we have valid dimensions
-                    if width == 0 or width is None:
-                        width = 612.0
-                    if height == 0 or height is None:
-                        height = 792.0
-                        
-                    page_info = {
-                        'page_number': getattr(page, 'page_no', page_idx) + 1,  # 1-based page numbers
-                        'width': float(width),
-                        'height': float(height)
-                    }
-                    document_data['pages'].append(page_info)
+            result = self._convert_one_pdf(pdf_path)
+            return self._result_to_json(pdf_path, result, output_file, start_time)
+        except Exception as e:
+            self.logger.error(f"Extraction failed: {e}")
+            raise
+    
+    def extract_many(self, pdf_files: List[str], output_dir: Optional[str] = None,
+                     force: bool = False):
+        """
+        Extract several PDFs through one Docling convert_all() pass
+        
+        Yields (pdf_file, document_data, error) in input order; exactly one of
+        document_data and error is None.
+        """
+        # Resolve missing and up-to-date files up front; the rest go to Docling
+        plan = []
+        pending = []
+        for pdf_file in pdf_files:
+            pdf_path = Path(pdf_file)
+            if not pdf_path.exists():
+                plan.append((pdf_file, None, f"PDF not found: {pdf_path}"))
+                continue
+            output_file = self._output_file(
+                pdf_path, Path(output_dir) / f"{pdf_path.stem}.json" if output_dir else None
+            )
+            cached = self._load_if_current(pdf_path, output_file, force)
+            if cached is not None:
+                plan.append((pdf_file, cached, None))
             else:
-                # Add default page if no page info available
-                self.logger.warning("No page information available, using default US Letter size")
-                document_data['pages'].append({
-                    'page_number': 1,
-                    'width': 612.0,
-                    'height': 792.0
-                })
+                plan.append(None)
+                pending.append((pdf_file, pdf_path, output_file))
+        
+        # convert_all keeps going past failures so one bad PDF doesn't abort
+        # the rest; Docling is only imported if something needs converting
+        results = iter(())
+        if pending:
+            from docling.datamodel.base_models import ConversionStatus
+            results = self.converter.convert_all([p for _, p, _ in pending], raises_on_error=False)
+        
+        # Match each result to its input by source path, not position, so a
+        # dropped or reordered result can't land under another file's name
+        waiting = {}
+        for index, (_, pdf_path, _) in enumerate(pending):
+            waiting.setdefault(pdf_path.resolve(), []).append(index)
+        outcomes = {}
+        next_index = 0
+        
+        start_time = time.perf_counter()
+        for entry in plan:
+            if entry is not None:
+                yield entry
+                continue
             
-            # Extract all items with spatial information
-            item_index = 0
-            items_by_page = {}  # Group items by page for better processing
+            # Pull results until this input's has arrived
+            index = next_index
+            next_index += 1
+            while index not in outcomes:
+                result = next(results, None)
+                if result is None:
+                    outcomes[index] = (pending[index][0], None, "No conversion result returned")
+                    break
+                indices = waiting.get(Path(result.input.file).resolve())
+                if not indices:
+                    self.logger.warning(f"Ignoring result for unexpected input: {result.input.file}")
+                    continue
+                
+                match = indices.pop(0)
+                pdf_file, pdf_path, output_file = pending[match]
+                if result.status in (ConversionStatus.SUCCESS, ConversionStatus.PARTIAL_SUCCESS):
+                    try:
+                        outcomes[match] = (pdf_file, self._result_to_json(pdf_path, result, output_file, start_time), None)
+                    except Exception as e:
+                        self.logger.error(f"Extraction failed: {e}")
+                        outcomes[match] = (pdf_file, None, str(e))
+                else:
+                    errors = '; '.join(err.error_message for err in getattr(result, 'errors', []))
+                    outcomes[match] = (pdf_file, None, errors or f"Conversion {result.status}")
+                start_time = time.perf_counter()
             
-            for item, level in result.document.iterate_items():
-                item_data = self._extract_item_data(item, level, item_index)
-                if item_data:
-                    document_data['items'].append(item_data)
-                    
-                    # Group by page for column detection
-                    page_no = item_data.get('page', 0)
-                    if page_no not in items_by_page:
-                        items_by_page[page_no] = []
-                    items_by_page[page_no].append(item_data)
-                    
-                    # Special handling for tables
-                    if item_data['type'] == 'TableItem':
-                        table_data = self._extract_table_data(item, item_index)
-                        if table_data:
-                            document_data['tables'].append(table_data)
+            yield outcomes.pop(index)
+    
+    def _output_file(self, pdf_path: Path, output_path: Optional[str]) -> Path:
+        """JSON output path for a PDF (defaults to pdf_name.json)"""
+        return Path(output_path) if output_path else pdf_path.with_suffix('.json')
+    
+    def _load_if_current(self, pdf_path: Path, output_file: Path,
+                         force: bool) -> Optional[Dict[str, Any]]:
+        """Load existing output newer than the PDF without touching Docling"""
+        if (force or not output_file.exists()
+                or output_file.stat().st_mtime < pdf_path.stat().st_mtime):
+            return None
+        self.logger.info(f"Up to date, loading: {output_file}")
+        with open(output_file, 'rb') as f:
+            data = f.read()
+        return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+    
+    def _convert_one_pdf(self, pdf_path: Path):
+        """Run Docling on a single PDF"""
+        return self.converter.convert(str(pdf_path))
+    
+    def _result_to_json(self, pdf_path: Path, result: Any, output_file: Path,
+                        start_time: float) -> Dict[str, Any]:
+        """Build document data from a Docling result and write it to output_file"""
+        now_iso = datetime.now().isoformat()
+        
+        # Build document structure
+        document_data = {
+            'metadata': {
+                'source_file': str(pdf_path),
+                'file_name': pdf_path.name,
+                'document_id': self._generate_document_id(str(pdf_path)),
+                'extraction_timestamp': now_iso,
+                'processing_time': 0,  # Will update at end
+                'docling_version': getattr(type(self.converter), '__version__', 'unknown')
+            },
+            'pages': [],
+            'items': [],
+            'tables': []
+        }
+        
+        # Extract page information if available
+        if hasattr(result.document, 'pages') and result.document.pages:
+            for page_idx, page in enumerate(result.document.pages):
+                # Debug what attributes the page has
+                if page_idx == 0 and self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("Page attributes: %s", [attr for attr in dir(page) if not attr.startswith('_')])
+                
+                # Try different attribute names
+                width = getattr(page, 'width', None) or getattr(page, 'size', {}).get('width', 612.0)
+                height = getattr(page, 'height', None) or getattr(page, 'size', {}).get('height', 792.0)
+                
+                # Ensure we have valid dimensions
+                if width == 0 or width is None:
+                    width = 612.0
+                if height == 0 or height is None:
+                    height = 792.0
                     
-                    item_index += 1
-            
-            # Post-process to detect columns and reading order
-            self._detect_columns_and_order(items_by_page, document_data)
-            
-            # Update processing time
-            processing_time = (datetime.now() - start_time).total_seconds()
-            document_data['metadata']['processing_time'] = processing_time
-            
-            # Save to file if output path specified
-            if output_path:
-                output_file = Path(output_path)
+                page_info = {
+                    'page_number': getattr(page, 'page_no', page_idx) + 1,  # 1-based page numbers
+                    'width': float(width),
+                    'height': float(height)
+                }
+                document_data['pages'].append(page_info)
+        else:
+            # Add default page if no page info available
+            self.logger.warning("No page information available, using default US Letter size")
+            document_data['pages'].append({
+                'page_number': 1,
+                'width': 612.0,
+                'height': 792.0
+            })
+        
+        # Page sizes keyed like prov.page_no, for relative item positions
+        self._page_dims = {}
+        if getattr(result.document, 'pages', None):
+            for page_no, page in result.document.pages.items():
+                size = getattr(page, 'size', None)
+                if size is not None and size.width and size.height:
+                    self._page_dims[page_no] = (float(size.width), float(size.height))
+        
+        # Extract all items with spatial information
+        item_index = 0
+        
+        # Struct-of-arrays copy of the bbox coordinates column detection
+        # needs, so it can run on contiguous arrays instead of item dicts
+        self._bbox_soa = {'left': [], 'top': [], 'page': [], 'idx': []}
+        add_left = self._bbox_soa['left'].append
+        add_top = self._bbox_soa['top'].append
+        add_page = self._bbox_soa['page'].append
+        add_idx = self._bbox_soa['idx'].append
+        
+        for item, level in result.document.iterate_items():
+            item_data = self._extract_item_data(item, level, item_index)
+            if item_data:
+                document_data['items'].append(item_data)
+                
+                # Record position for column detection
+                bbox = item_data['bbox']
+                if bbox:
+                    add_left(bbox['left'])
+                    add_top(bbox['top'])
+                    add_page(item_data['page'])
+                    add_idx(item_index)
+                
+                # Special handling for tables
+                if item_data['type'] == 'TableItem':
+                    table_data = self._extract_table_data(item, item_index)
+                    if table_data:
+                        document_data['tables'].append(table_data)
+                
+                item_index += 1
+        
+        # Post-process to detect columns and reading order
+        self._detect_columns_and_order(document_data)
+        
+        # Update processing time
+        processing_time = time.perf_counter() - start_time
+        document_data['metadata']['processing_time'] = processing_time
+        
+        # Large buffer so the many small per-item writes coalesce into few syscalls
+        with open(output_file, 'wb', buffering=1 << 20) as f:
+            self._stream_write_document(f, document_data)
+        
+        self.logger.info(f"Extracted {len(document_data['items'])} items in {processing_time:.2f}s")
+        
+        
+        self.logger.info(f"Saved to: {output_file}")
+        
+        return document_data
+    
+    def _stream_write_document(self, f, document_data: Dict[str, Any]):
+        """Write document JSON incrementally, one item/table at a time
+        
+        Avoids materializing the whole serialized document next to the
+        in-memory dicts; list sections are written element by element.
+        """
+        f.write(b'{')
+        for key_idx, (key, value) in enumerate(document_data.items()):
+            if key_idx:
+                f.write(b',')
+            f.write(_json_bytes(key) + b':')
+            if isinstance(value, list):
+                f.write(b'[')
+                for i, element in enumerate(value):
+                    f.write(b',\n' if i else b'\n')
+                    f.write(_json_bytes(element))
+                f.write(b'\n]')
             else:
-                output_file = pdf_path.with_suffix('.json')
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(document_data, f, indent=2, ensure_ascii=False)
-            
-            self.logger.info(f"Extracted {len(document_data['items'])} items in {processing_time:.2f}s")
-            
-            
-            self.logger.info(f"Saved to: {output_file}")
-            
-            return document_data
-            
-        except Exception as e:
-            self.logger.error(f"Extraction failed: {e}")
-            raise
+                f.write(_json_bytes(value))
+        f.write(b'}\n')
     
     def _extract_item_data(self, item: Any, level: int, index: int) -> Optional[Dict[str, Any]]:
         """Extract data from a single document item with enhanced form detection"""
         try:
-            item_type = type(item).__name__
+            item_cls = type(item)
+            item_type = item_cls.__name__
             
             # Log the actual types Docling provides for debugging
-            self.logger.debug(f"Docling item type: {item_type}")
+            self.logger.debug("Docling item type: %s", item_type)
             
+            # Which optional attributes this item type carries, probed once per type
+            try:
+                present, type_handler = self._type_profiles[item_cls]
+            except KeyError:
+                present = frozenset(attr for attr in PROBED_ATTRIBUTES if hasattr(item, attr))
+                type_handler = self._TYPE_ATTRIBUTE_HANDLERS.get(item_type)
+                self._type_profiles[item_cls] = (present, type_handler)
             
             # Base item data
-            item_data = {
-                'index': index,
-                'type': item_type,
-                'level': level,
-                'content': '',
-                'bbox': None,
-                'page': 0,
-                'confidence': getattr(item, 'confidence', 1.0),
-                'attributes': {}
-            }
+            item_data = _ITEM_TEMPLATE.copy()
+            item_data['index'] = index
+            item_data['type'] = item_type
+            item_data['level'] = level
+            item_data['confidence'] = item.confidence if 'confidence' in present else 1.0
+            item_data['attributes'] = {}
             
             # Extract text content
-            if hasattr(item, 'text'):
+            if 'text' in present:
                 item_data['content'] = str(item.text)
-            elif hasattr(item, 'caption'):
+            elif 'caption' in present:
                 item_data['content'] = str(item.caption)
             
             # Enhanced form field detection
             content = item_data['content'].strip()
-            content_lower = content.lower()
             
             # Detect form labels (text ending with colon)
             if content.endswith(':'):
@@ -232,52 +555,56 @@ class Chonker2:
                 item_data['attributes']['form_type'] = 'label'
             
             # Detect checkboxes
-            elif content in ['[ ]', '[X]', '[x]', '☐', '☑', '□', '■', '▢', '▣']:
+            elif content in CHECKBOX_MARKS:
                 item_data['type'] = 'Checkbox'
-                item_data['attributes']['checked'] = content in ['[X]', '[x]', '☑', '■', '▣']
+                item_data['attributes']['checked'] = content in CHECKED_MARKS
             
             # Detect form field indicators
-            elif any(indicator in content_lower for indicator in [
-                'name:', 'date:', 'address:', 'phone:', 'email:', 'signature:', 
-                'id:', 'no.', 'number:', 'title:', 'ssn:', 'dob:', 'zip:'
-            ]):
+            elif FORM_FIELD_RE.search(content):
                 item_data['attributes']['possible_form_field'] = True
                 item_data['type'] = 'FormLabel'
             
             # Detect underlined areas (common in forms)
-            elif content == '_' * len(content) or content == '-' * len(content):
+            elif content and content[0] in UNDERLINE_CHARS and content.count(content[0]) == len(content):
                 item_data['type'] = 'FormField'
                 item_data['attributes']['field_type'] = 'text_input'
             
             # Extract spatial information
-            if hasattr(item, 'prov') and item.prov and len(item.prov) > 0:
-                prov = item.prov[0]
+            prov_list = item.prov if 'prov' in present else None
+            if prov_list:
+                prov = prov_list[0]
                 
                 # Page number
-                if hasattr(prov, 'page_no'):
+                try:
                     item_data['page'] = prov.page_no
+                except AttributeError:
+                    pass
                 
                 # Bounding box with validation
-                if hasattr(prov, 'bbox'):
+                try:
                     bbox = prov.bbox
+                except AttributeError:
+                    pass
+                else:
                     # Validate bbox values
-                    if all(hasattr(bbox, attr) for attr in ['l', 't', 'r', 'b']):
-                        left = float(bbox.l)
-                        top = float(bbox.t)
-                        right = float(bbox.r)
-                        bottom = float(bbox.b)
-                        
+                    try:
+                        left, top, right, bottom = float(bbox.l), float(bbox.t), float(bbox.r), float(bbox.b)
+                    except (AttributeError, TypeError):
+                        pass
+                    else:
                         # Ensure valid dimensions
                         # For BOTTOMLEFT origin: top > bottom (top is higher Y value)
                         # For TOPLEFT origin: bottom > top (bottom is higher Y value)
                         coord_origin = str(getattr(bbox, 'coord_origin', 'BOTTOMLEFT'))
+                        bottom_left = 'BOTTOMLEFT' in coord_origin
+                        valid_bbox = right > left and (top > bottom if bottom_left else bottom > top)
                         
-                        if 'BOTTOMLEFT' in coord_origin:
-                            valid_bbox = right > left and top > bottom
-                        else:
-                            valid_bbox = right > left and bottom > top
-                            
                         if valid_bbox:
+                            # Relative position for better layout reconstruction,
+                            # using page sizes collected once per document
+                            page_width, page_height = self._page_dims.get(item_data['page'], DEFAULT_PAGE_DIMS)
+                            inv_w = 1.0 / page_width
+                            inv_h = 1.0 / page_height
                             item_data['bbox'] = {
                                 'left': left,
                                 'top': top,
@@ -285,68 +612,48 @@ class Chonker2:
                                 'bottom': bottom,
                                 'width': right - left,
                                 'height': abs(top - bottom),
-                                'coord_origin': coord_origin
+                                'coord_origin': coord_origin,
+                                'relative': {
+                                    'x_ratio': left * inv_w,
+                                    'y_ratio': top * inv_h,
+                                    'width_ratio': (right - left) * inv_w,
+                                    'height_ratio': abs(top - bottom) * inv_h
+                                }
                             }
                         else:
                             self.logger.warning(f"Invalid bbox dimensions for item {index}: {bbox}")
-                    
-                    # Add relative position for better layout reconstruction
-                    # Get page dimensions if available
-                    if hasattr(prov, 'page') and hasattr(prov.page, 'width') and hasattr(prov.page, 'height'):
-                        page_width = float(prov.page.width) if prov.page.width > 0 else 612  # Default letter size
-                        page_height = float(prov.page.height) if prov.page.height > 0 else 792
-                        
-                        item_data['bbox']['relative'] = {
-                            'x_ratio': bbox.l / page_width,
-                            'y_ratio': bbox.t / page_height,
-                            'width_ratio': (bbox.r - bbox.l) / page_width,
-                            'height_ratio': (bbox.b - bbox.t) / page_height
-                        }
             
             # Type-specific attributes
-            if item_type == 'SectionHeaderItem':
-                item_data['attributes']['header_level'] = self._get_header_level(item, level)
-            elif item_type == 'ListItem':
-                item_data['attributes']['marker'] = getattr(item, 'marker', '')
-                item_data['attributes']['list_level'] = getattr(item, 'level', 0)
-            elif item_type == 'FigureItem':
-                item_data['attributes']['caption'] = getattr(item, 'caption', '')
+            if type_handler:
+                type_handler(self, item, level, item_data['attributes'])
             
             # Extract font and style information if available
             style_info = {}
             
             # Check direct style attribute
-            if hasattr(item, 'style'):
-                if hasattr(item.style, 'font_name'):
-                    style_info['font'] = str(item.style.font_name)
-                if hasattr(item.style, 'font_size'):
-                    style_info['font_size'] = float(item.style.font_size)
-                if hasattr(item.style, 'bold'):
-                    style_info['bold'] = bool(item.style.bold)
-                if hasattr(item.style, 'italic'):
-                    style_info['italic'] = bool(item.style.italic)
+            if 'style' in present:
+                _copy_style_fields(item.style, STYLE_FIELDS, style_info)
             
             # Also check for text_style attribute (some Docling versions)
-            if hasattr(item, 'text_style'):
-                if hasattr(item.text_style, 'is_bold'):
-                    style_info['bold'] = bool(item.text_style.is_bold)
-                if hasattr(item.text_style, 'is_italic'):
-                    style_info['italic'] = bool(item.text_style.is_italic)
-                if hasattr(item.text_style, 'font_size'):
-                    style_info['font_size'] = float(item.text_style.font_size)
+            if 'text_style' in present:
+                _copy_style_fields(item.text_style, TEXT_STYLE_FIELDS, style_info)
             
             # Check in provenance data for style info
-            if hasattr(item, 'prov') and item.prov:
-                for prov in item.prov:
-                    if hasattr(prov, 'text_style'):
-                        ts = prov.text_style
-                        if hasattr(ts, 'font_size') and 'font_size' not in style_info:
-                            style_info['font_size'] = float(ts.font_size)
-                        if hasattr(ts, 'font_weight') and 'bold' not in style_info:
-                            # Font weight > 400 typically indicates bold
-                            style_info['bold'] = ts.font_weight > 400
-                        if hasattr(ts, 'font_style') and 'italic' not in style_info:
-                            style_info['italic'] = ts.font_style == 'italic'
+            if prov_list:
+                for prov in prov_list:
+                    ts = getattr(prov, 'text_style', _MISSING)
+                    if ts is _MISSING:
+                        continue
+                    font_size = getattr(ts, 'font_size', _MISSING)
+                    if font_size is not _MISSING and 'font_size' not in style_info:
+                        style_info['font_size'] = float(font_size)
+                    font_weight = getattr(ts, 'font_weight', _MISSING)
+                    if font_weight is not _MISSING and 'bold' not in style_info:
+                        # Font weight > 400 typically indicates bold
+                        style_info['bold'] = font_weight > 400
+                    font_style = getattr(ts, 'font_style', _MISSING)
+                    if font_style is not _MISSING and 'italic' not in style_info:
+                        style_info['italic'] = font_style == 'italic'
             
             if style_info:
                 item_data['attributes']['style'] = style_info
@@ -368,57 +675,64 @@ class Chonker2:
                 'cells': []
             }
             
-            # Try to get table as markdown for structure
-            if hasattr(table_item, 'export_to_markdown'):
-                markdown = table_item.export_to_markdown()
-                if markdown and '|' in markdown:
-                    lines = markdown.strip().split('\n')
-                    table_data['num_rows'] = len([l for l in lines if '|' in l and '---' not in l])
-                    if lines:
-                        first_row = [c.strip() for c in lines[0].split('|') if c.strip()]
-                        table_data['num_cols'] = len(first_row)
-            
-            # Try to get individual cells with positions
-            if hasattr(table_item, 'table_cells'):
-                for cell in table_item.table_cells:
-                    cell_data = {
-                        'row': getattr(cell, 'row', 0),
-                        'col': getattr(cell, 'col', 0),
-                        'content': str(getattr(cell, 'text', '')),
-                        'rowspan': getattr(cell, 'rowspan', 1),
-                        'colspan': getattr(cell, 'colspan', 1)
+            # Try to get individual cells with positions; older Docling keeps
+            # them on the item, newer versions under .data with offset indices
+            table_cells = getattr(table_item, 'table_cells', None)
+            if table_cells is None:
+                table_cells = getattr(getattr(table_item, 'data', None), 'table_cells', None) or []
+            
+            # Table size comes from the cell extents, tracked in the same pass
+            num_rows = num_cols = 0
+            has_header = False
+            for cell in table_cells:
+                # Cell fields are plain instance attributes, so read them from
+                # the instance dict in one place rather than via getattr each
+                fields = getattr(cell, '__dict__', None)
+                if fields is None:
+                    fields = {name: getattr(cell, name) for name in CELL_FIELDS if hasattr(cell, name)}
+                get = fields.get
+                
+                row = get('row')
+                col = get('col')
+                cell_data = {
+                    'row': row if row is not None else get('start_row_offset_idx', 0),
+                    'col': col if col is not None else get('start_col_offset_idx', 0),
+                    'content': str(get('text', '')),
+                    'rowspan': get('rowspan') or get('row_span', 1),
+                    'colspan': get('colspan') or get('col_span', 1)
+                }
+                
+                # Cell bounding box if available
+                bbox = get('bbox')
+                if bbox is not None:
+                    cell_data['bbox'] = {
+                        'left': float(bbox.l),
+                        'top': float(bbox.t),
+                        'right': float(bbox.r),
+                        'bottom': float(bbox.b)
                     }
-                    
-                    # Cell bounding box if available
-                    if hasattr(cell, 'bbox'):
-                        bbox = cell.bbox
-                        cell_data['bbox'] = {
-                            'left': float(bbox.l),
-                            'top': float(bbox.t),
-                            'right': float(bbox.r),
-                            'bottom': float(bbox.b)
-                        }
-                    
-                    table_data['cells'].append(cell_data)
-            
-            # Try to export as dataframe for structured data
-            if hasattr(table_item, 'export_to_dataframe'):
-                try:
-                    df = table_item.export_to_dataframe()
-                    
-                    # Convert to row-based structure
-                    for idx, row in df.iterrows():
-                        row_data = {
-                            'index': idx,
-                            'cells': [str(val) for val in row.values]
-                        }
-                        table_data['rows'].append(row_data)
-                    
-                    # Add column headers
-                    table_data['headers'] = [str(col) for col in df.columns]
-                    
-                except Exception as e:
-                    self.logger.debug(f"Failed to export table as dataframe: {e}")
+                
+                if cell_data['row'] == 0 and get('column_header', False):
+                    has_header = True
+                num_rows = max(num_rows, cell_data['row'] + cell_data['rowspan'])
+                num_cols = max(num_cols, cell_data['col'] + cell_data['colspan'])
+                
+                table_data['cells'].append(cell_data)
+            
+            # Row-based structure straight from the cells (spans repeat their
+            # text in every covered slot), instead of a pandas round-trip
+            table_data['num_rows'] = num_rows
+            table_data['num_cols'] = num_cols
+            if table_data['cells']:
+                grid = [[''] * num_cols for _ in range(num_rows)]
+                for c in table_data['cells']:
+                    for r in range(c['row'], c['row'] + c['rowspan']):
+                        grid[r][c['col']:c['col'] + c['colspan']] = [c['content']] * c['colspan']
+                
+                if has_header:
+                    table_data['headers'] = grid[0]
+                    grid = grid[1:]
+                table_data['rows'] = [{'index': i, 'cells': row} for i, row in enumerate(grid)]
             
             return table_data
             
@@ -432,101 +746,116 @@ class Chonker2:
         # For now, use document structure level
         return min(level + 1, 6)
     
+    def _header_attributes(self, item: Any, level: int, attributes: Dict[str, Any]):
+        attributes['header_level'] = self._get_header_level(item, level)
+    
+    def _list_attributes(self, item: Any, level: int, attributes: Dict[str, Any]):
+        attributes['marker'] = getattr(item, 'marker', '')
+        attributes['list_level'] = getattr(item, 'level', 0)
+    
+    def _figure_attributes(self, item: Any, level: int, attributes: Dict[str, Any]):
+        attributes['caption'] = getattr(item, 'caption', '')
+    
+    # Docling item type name -> handler adding type-specific attributes
+    _TYPE_ATTRIBUTE_HANDLERS = {
+        'SectionHeaderItem': _header_attributes,
+        'ListItem': _list_attributes,
+        'FigureItem': _figure_attributes,
+    }
+    
     def _generate_document_id(self, pdf_path: str) -> str:
-        """Generate unique document ID"""
-        return hashlib.sha256(f"{pdf_path}_{datetime.now().isoformat()}".encode()).hexdigest()[:16]
+        """Generate a stable document ID from the PDF's contents"""
+        # Same bytes -> same ID across runs, so downstream dedup can key on it
+        h = _content_hasher()
+        with open(pdf_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()[:16]
     
-    def _detect_columns_and_order(self, items_by_page: Dict[int, List[Dict]], document_data: Dict):
+    def _detect_columns_and_order(self, document_data: Dict):
         """Detect multi-column layouts and fix reading order"""
+        soa = self._bbox_soa
+        if not soa['idx']:
+            return
         
-        for page_no, page_items in items_by_page.items():
-            if not page_items:
-                continue
-            
-            # Get items with valid bounding boxes
-            items_with_bbox = [item for item in page_items if item.get('bbox')]
-            
-            if len(items_with_bbox) < 5:
+        all_pages = np.asarray(soa['page'], dtype=np.int64)
+        all_lefts = np.asarray(soa['left'], dtype=np.float64)
+        all_tops = np.asarray(soa['top'], dtype=np.float64)
+        all_idx = np.asarray(soa['idx'], dtype=np.int64)
+        items = document_data['items']
+        
+        # Group by page with one stable sort, rather than a full-length mask
+        # per page; items keep document order within each page
+        by_page = np.argsort(all_pages, kind='stable')
+        page_nos, starts, counts = np.unique(all_pages[by_page], return_index=True, return_counts=True)
+        
+        for page_no, start, n in zip(page_nos.tolist(), starts.tolist(), counts.tolist()):
+            # Items on this page with valid bounding boxes
+            if n < 5:
                 continue
-                
-            # Analyze x-coordinate distribution to detect columns
-            x_positions = [item['bbox']['left'] for item in items_with_bbox]
-            x_positions.sort()
             
-            # Find gaps between x-positions to identify column boundaries
-            gaps = []
-            column_threshold = 50  # Minimum gap to consider as column boundary
+            on_page = by_page[start:start + n]
+            lefts = all_lefts[on_page]
+            tops = all_tops[on_page]
+            page_item_idx = all_idx[on_page]
             
-            for i in range(1, len(x_positions)):
-                gap_size = x_positions[i] - x_positions[i-1]
-                if gap_size > column_threshold:
-                    gaps.append((x_positions[i-1] + gap_size/2, gap_size))
+            # Find column boundaries, then order by row band and column
+            gap_mids, columns, row_bands, reading_order = _assign_columns_bands(
+                lefts, tops, COLUMN_GAP_THRESHOLD, ROW_HEIGHT_ESTIMATE
+            )
             
             # If we found significant gaps, we have columns
-            if gaps:
-                # Define column boundaries
-                column_boundaries = [0]  # Start of first column
-                column_boundaries.extend([gap[0] for gap in gaps])
-                column_boundaries.append(float('inf'))  # End of last column
+            if gap_mids.size:
+                for i, col, band, pos in zip(page_item_idx.tolist(), columns.tolist(),
+                                             row_bands.tolist(), reading_order.tolist()):
+                    attributes = items[i]['attributes']
+                    if col >= 0:
+                        attributes['column'] = col
+                    attributes['row_band'] = band
+                    attributes['reading_order'] = pos
                 
-                # Assign items to columns and sort by reading order
-                for item in items_with_bbox:
-                    x = item['bbox']['left']
-                    
-                    # Find which column this item belongs to
-                    for col_idx in range(len(column_boundaries) - 1):
-                        if column_boundaries[col_idx] <= x < column_boundaries[col_idx + 1]:
-                            item['attributes']['column'] = col_idx
-                            break
-                
-                # Re-sort items: by row first (using y-coordinate bands), then by column
-                # This ensures proper reading order for multi-column layouts
-                row_height_estimate = 20  # Approximate line height
-                
-                for item in items_with_bbox:
-                    item['attributes']['row_band'] = int(item['bbox']['top'] / row_height_estimate)
-                
-                # Sort by row band first, then by column
-                items_with_bbox.sort(key=lambda x: (
-                    x['attributes'].get('row_band', 0),
-                    x['attributes'].get('column', 0)
-                ))
-                
-                # Update reading order
-                for idx, item in enumerate(items_with_bbox):
-                    item['attributes']['reading_order'] = idx
-                
-                self.logger.info(f"Page {page_no}: Detected {len(gaps) + 1} columns")
+                num_columns = gap_mids.size + 1
+                self.logger.info(f"Page {page_no}: Detected {num_columns} columns")
                 
                 # Add column info to page metadata
                 if page_no < len(document_data['pages']):
-                    document_data['pages'][page_no]['columns'] = len(gaps) + 1
-                    document_data['pages'][page_no]['column_boundaries'] = column_boundaries[:-1]
+                    document_data['pages'][page_no]['columns'] = num_columns
+                    document_data['pages'][page_no]['column_boundaries'] = [0] + gap_mids.tolist()
     
-    def batch_process(self, pdf_files: List[str], output_dir: Optional[str] = None):
-        """Process multiple PDFs"""
-        results = []
+    def batch_process(self, pdf_files: List[str], output_dir: Optional[str] = None,
+                      max_workers: Optional[int] = None, force: bool = False):
+        """Process multiple PDFs in parallel worker processes"""
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 2) // 2)
+        max_workers = min(max_workers, len(pdf_files))
+        # Split the cores between workers so torch doesn't oversubscribe them
+        threads_per_worker = max(1, (os.cpu_count() or 1) // max_workers)
         
-        for pdf_file in pdf_files:
-            try:
-                if output_dir:
-                    output_path = Path(output_dir) / f"{Path(pdf_file).stem}.json"
-                else:
-                    output_path = None
-                
-                result = self.extract_to_json(pdf_file, output_path)
-                results.append({
-                    'file': pdf_file,
-                    'success': True,
-                    'items': len(result['items']),
-                    'tables': len(result['tables'])
-                })
-            except Exception as e:
-                results.append({
-                    'file': pdf_file,
-                    'success': False,
-                    'error': str(e)
-                })
+        # Each worker builds its own extractor of the same class once, since
+        # the Docling converter can't be shared across processes, and runs a
+        # single convert_all() over a round-robin shard of the files
+        shards = [list(range(i, len(pdf_files), max_workers)) for i in range(max_workers)]
+        results = [None] * len(pdf_files)
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_worker,
+                                 initargs=(type(self), self._init_kwargs, threads_per_worker)) as executor:
+            futures = {
+                executor.submit(_worker_extract_shard,
+                                [pdf_files[idx] for idx in shard], output_dir, force): shard
+                for shard in shards
+            }
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    for idx, record in zip(shard, future.result()):
+                        results[idx] = record
+                except Exception as e:
+                    for idx in shard:
+                        results[idx] = {
+                            'file': pdf_files[idx],
+                            'success': False,
+                            'error': str(e)
+                        }
         
         # Print summary
         successful = sum(1 for r in results if r['success'])
@@ -539,6 +868,42 @@ class Chonker2:
                 print(f"✗ {result['file']}: {result['error']}")
 
 
+# Per-process extractor used by batch_process workers
+_worker_extractor = None
+
+
+def _init_worker(extractor_cls, init_kwargs: Dict[str, Any], num_threads: int):
+    """Create the worker process's extractor (and its Docling models) once"""
+    global _worker_extractor
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+    _worker_extractor = extractor_cls(**init_kwargs)
+
+
+def _worker_extract_shard(pdf_files: List[str], output_dir: Optional[str],
+                          force: bool) -> List[Dict[str, Any]]:
+    """Extract a shard of PDFs in a worker process and return their summary records"""
+    records = []
+    for pdf_file, result, error in _worker_extractor.extract_many(pdf_files, output_dir, force):
+        if error is None:
+            records.append({
+                'file': pdf_file,
+                'success': True,
+                'items': len(result['items']),
+                'tables': len(result['tables'])
+            })
+        else:
+            records.append({
+                'file': pdf_file,
+                'success': False,
+                'error': error
+            })
+    return records
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Chonker2 - Extract PDF content to JSON with spatial information'
@@ -546,8 +911,12 @@ def main():
     parser.add_argument('input', nargs='+', help='PDF file(s) to process')
     parser.add_argument('-o', '--output', help='Output directory for JSON files')
     parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose logging')
+    parser.add_argument('-f', '--force', action='store_true', help='Re-extract even if JSON output is up to date')
+    parser.add_argument('-j', '--jobs', type=int, help='Worker processes for batch mode (default: half the CPUs)')
     
     args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('-j/--jobs must be at least 1')
     
     # Create extractor
     extractor = Chonker2(verbose=args.verbose)
@@ -555,10 +924,10 @@ def main():
     # Process files
     if len(args.input) == 1:
         # Single file
-        extractor.extract_to_json(args.input[0], args.output)
+        extractor.extract_to_json(args.input[0], args.output, force=args.force)
     else:
         # Batch processing
-        extractor.batch_process(args.input, args.output)
+        extractor.batch_process(args.input, args.output, max_workers=args.jobs, force=args.force)
 
 
 if __name__ == '__main__':
@@ -2,39 +2,116 @@
 """
 Enhanced Chonker2 with preprocessing and post-processing for better OCR
 """
+import os
 import sys
+import io
+import math
 import json
 import subprocess
 import tempfile
 import shutil
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from PIL import Image, ImageEnhance, ImageFilter
 import numpy as np
+import pypdfium2 as pdfium
+
+try:
+    import cv2
+    HAS_CV2 = True
+except ImportError:
+    HAS_CV2 = False
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Pages with more characters than this in their text layer skip OCR
+# preprocessing; a few stray characters (a stamped page number) don't count
+MIN_TEXT_CHARS = 50
 
 # Import the original chonker2
 sys.path.insert(0, str(Path(__file__).parent))
 from chonker2 import Chonker2
 
+
+# Page means are taken over every SAMPLE_STRIDE-th row and column; a
+# 1/64 sample of a page render is plenty for picking a threshold
+SAMPLE_STRIDE = 8
+
+
+def _sampled_mean(img_array):
+    """Mean gray level of a strided subsample of the page"""
+    return float(img_array[::SAMPLE_STRIDE, ::SAMPLE_STRIDE].mean())
+
+
+def _binarize_numpy(img_array, threshold):
+    """Simple adaptive thresholding: white above threshold, black at or below"""
+    # 256-entry lookup table: one indexed copy instead of a bool temporary
+    # and an int64 multiply (gray levels are integers, so v > t <=> v >= floor(t) + 1)
+    lut = np.zeros(256, dtype=np.uint8)
+    lut[max(math.floor(threshold) + 1, 0):] = 255
+    return lut[img_array]
+
+
+def _binarize_loop(img_array, threshold):
+    """Single-pass equivalent of _binarize_numpy for Numba"""
+    flat = img_array.ravel()
+    out = np.empty(flat.size, dtype=np.uint8)
+    for i in range(flat.size):
+        out[i] = 255 if flat[i] > threshold else 0
+    return out.reshape(img_array.shape)
+
+
+if HAS_NUMBA:
+    _binarize = njit(cache=True, nogil=True)(_binarize_loop)
+else:
+    _binarize = _binarize_numpy
+
 class EnhancedChonker2(Chonker2):
     """Enhanced version with preprocessing for better OCR"""
     
-    def __init__(self, verbose: bool = False, preprocess: bool = True):
+    # Docling, pypdfium2 and OCR-engine loggers raised to DEBUG in verbose mode
+    OCR_LOGGERS = ('docling', 'docling.backend', 'docling.pipeline', 'pypdfium2',
+                   'ocrmac', 'tesseract', 'rapidocr', 'easyocr')
+    
+    def __init__(self, verbose: bool = False, preprocess: bool = True, dpi: int = 200):
         super().__init__(verbose)
+        self._init_kwargs.update(preprocess=preprocess, dpi=dpi)
         self.preprocess = preprocess
+        # Render resolution for preprocessing; 200 DPI is enough for OCR
+        self.dpi = dpi
         
         # Set up more detailed logging
         if verbose:
-            import logging
             # Configure root logger to show more details
             logging.basicConfig(
                 level=logging.DEBUG,
                 format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
                 force=True
             )
+            
+            # Show OCR engine detection and other OCR details
+            for logger_name in self.OCR_LOGGERS:
+                logging.getLogger(logger_name).setLevel(logging.DEBUG)
     
     def enhance_image(self, image_path, output_path):
         """Apply image enhancement for better OCR"""
-        img = Image.open(image_path)
+        img = self.enhance_page(Image.open(image_path))
+        
+        # Save enhanced image
+        img.save(output_path, dpi=(self.dpi, self.dpi))
+        
+        return output_path
+    
+    def enhance_page(self, img):
+        """Enhance a rendered page in memory, returning a 1-bit image"""
+        if HAS_CV2:
+            return self._enhance_page_cv2(img)
         
         # Convert to grayscale if not already
         if img.mode != 'L':
@@ -54,16 +131,34 @@ class EnhancedChonker2(Chonker2):
         # Convert to numpy array for processing
         img_array = np.array(img)
         
-        # Simple adaptive thresholding
-        threshold = np.mean(img_array) - 10
-        img_array = ((img_array > threshold) * 255).astype(np.uint8)
+        # Simple adaptive thresholding; the result is pure black/white, so
+        # mode '1' stores it at a bit per pixel without dithering anything
+        threshold = _sampled_mean(img_array) - 10
+        return Image.fromarray(_binarize(img_array, threshold)).convert('1')
+    
+    def _enhance_page_cv2(self, image):
+        """OpenCV version of enhance_page, reusing one page-sized buffer
         
-        img = Image.fromarray(img_array)
+        Contrast is a single scale/offset around the mean; the sharpness
+        boost and the unsharp mask are folded into one unsharp pass whose
+        amount is their sum.
+        """
+        img = np.array(image.convert('L'))
         
-        # Save enhanced image
-        img.save(output_path, dpi=(300, 300))
+        # Contrast 1.5x around the mean gray level
+        mean = _sampled_mean(img)
+        cv2.addWeighted(img, 1.5, img, 0, -0.5 * mean, dst=img)
         
-        return output_path
+        # Sharpen: img + amount * (img - blur), amount = 1.0 (sharpness 2.0) + 1.5 (unsharp 150%)
+        blur = cv2.GaussianBlur(img, (0, 0), sigmaX=2)
+        cv2.addWeighted(img, 3.5, blur, -2.5, 0, dst=img)
+        del blur
+        
+        # Simple adaptive thresholding
+        threshold = _sampled_mean(img) - 10
+        cv2.threshold(img, threshold, 255, cv2.THRESH_BINARY, dst=img)
+        
+        return Image.fromarray(img).convert('1')
     
     def preprocess_pdf(self, input_pdf):
         """Preprocess PDF for better OCR"""
@@ -71,138 +166,184 @@ class EnhancedChonker2(Chonker2):
             return input_pdf
             
         input_path = Path(input_pdf)
-        temp_dir = Path(tempfile.mkdtemp())
+        # Work next to the input so the finished PDF can be moved, not copied;
+        # fall back to the system temp dir if that directory isn't writable
+        try:
+            temp_dir = Path(tempfile.mkdtemp(dir=input_path.parent))
+        except OSError:
+            temp_dir = Path(tempfile.mkdtemp())
         
+        pdf = None
         try:
             self.logger.info("Preprocessing PDF for enhanced OCR...")
             
-            # Import pypdfium2
-            import pypdfium2 as pdfium
-            
             pdf = pdfium.PdfDocument(str(input_pdf))
-            enhanced_images = []
+            # Pages with a text layer don't need OCR; they are copied over
+            # as-is and only the raster pages are rendered and enhanced
+            text_pages = set()
+            enhanced_pages = []
             
-            # Process each page
-            for i in range(len(pdf)):
-                page = pdf[i]
+            # Render pages here (pdfium isn't thread-safe) while worker
+            # threads enhance the pages already rendered; the OpenCV/PIL
+            # filters release the GIL
+            workers = os.cpu_count() or 1
+            enhancer = ThreadPoolExecutor(max_workers=workers)
+            in_flight = deque()
+            
+            try:
+                # Process each page
+                for i in range(len(pdf)):
+                    page = pdf[i]
+                
+                    textpage = page.get_textpage()
+                    if textpage.count_chars() > MIN_TEXT_CHARS:
+                        text_pages.add(i)
+                    textpage.close()
+                    if i in text_pages:
+                        page.close()
+                        continue
+                
+                    # Render at the target resolution (PDF points are 1/72 inch)
+                    bitmap = page.render(scale=self.dpi / 72)
+                    image = bitmap.to_pil()
                 
-                # Render at high resolution (300 DPI = ~4.17x scale)
-                bitmap = page.render(scale=4.17)
-                image = bitmap.to_pil()
+                    # Enhance the render in memory, no PNG round-trip;
+                    # grayscale it first so queued pages take a third of the space
+                    enhanced_pages.append(enhancer.submit(self._enhance_to_pdf, image.convert('L')))
+                    in_flight.append((i, enhanced_pages[-1]))
                 
-                # Save original high-res image
-                orig_path = temp_dir / f'page_{i:03d}_orig.png'
-                image.save(orig_path)
+                    # Release the page's render buffers before the next page
+                    del image
+                    bitmap.close()
+                    page.close()
                 
-                # Enhance the image
-                enhanced_path = temp_dir / f'page_{i:03d}_enhanced.png'
-                self.enhance_image(orig_path, enhanced_path)
-                enhanced_images.append(enhanced_path)
+                    # Don't let rendering run far ahead of the enhancers
+                    while len(in_flight) > 2 * workers:
+                        self._log_enhanced(*in_flight.popleft())
                 
-                self.logger.info(f"Enhanced page {i+1}")
+                while in_flight:
+                    self._log_enhanced(*in_flight.popleft())
+            finally:
+                # Stop the enhancers even if rendering failed part-way
+                enhancer.shutdown(cancel_futures=True)
             
-            pdf.close()
+            if not enhanced_pages:
+                self.logger.info("All pages have a text layer, skipping enhancement")
+                return input_pdf
             
             # Convert enhanced images back to PDF
             self.logger.info("Creating enhanced PDF...")
             
-            if enhanced_images:
-                # Use PIL to create PDF from images
-                images = [Image.open(img_path) for img_path in enhanced_images]
-                
-                # Create temp enhanced PDF
-                enhanced_pdf = temp_dir / f"{input_path.stem}_enhanced.pdf"
-                
-                # Save as PDF
-                images[0].save(
-                    enhanced_pdf,
-                    "PDF",
-                    save_all=True,
-                    append_images=images[1:] if len(images) > 1 else [],
-                    resolution=300.0
-                )
-                
-                # Copy to a persistent location before cleanup
-                output_pdf = input_path.parent / f"{input_path.stem}_enhanced.pdf"
+            # Create temp enhanced PDF
+            enhanced_pdf = temp_dir / f"{input_path.stem}_enhanced.pdf"
+            
+            # Each worker encoded its page as a one-page PDF, so only the
+            # compressed pages are held; stitch them together with the
+            # untouched text pages one page at a time
+            merged = pdfium.PdfDocument.new()
+            enhanced = iter(enhanced_pages)
+            for i in range(len(pdf)):
+                if i in text_pages:
+                    merged.import_pages(pdf, [i])
+                    continue
+                page_pdf = pdfium.PdfDocument(next(enhanced).result())
+                merged.import_pages(page_pdf)
+                page_pdf.close()
+            merged.save(str(enhanced_pdf))
+            merged.close()
+            del enhanced_pages, enhanced
+            if text_pages:
+                self.logger.info(f"Kept {len(text_pages)} text pages unchanged")
+            
+            # Move to a persistent location before cleanup
+            output_pdf = input_path.parent / f"{input_path.stem}_enhanced.pdf"
+            try:
+                os.replace(enhanced_pdf, output_pdf)
+            except OSError:
                 shutil.copy2(enhanced_pdf, output_pdf)
-                
-                self.logger.info(f"Created enhanced PDF: {output_pdf}")
-                return str(output_pdf)
+            
+            self.logger.info(f"Created enhanced PDF: {output_pdf}")
+            return str(output_pdf)
             
         except Exception as e:
             self.logger.error(f"Preprocessing failed: {e}")
             return input_pdf
         finally:
             # Cleanup
+            if pdf is not None:
+                pdf.close()
             shutil.rmtree(temp_dir, ignore_errors=True)
     
+    def _enhance_to_pdf(self, image):
+        """Enhance one page and encode it as a single-page PDF"""
+        buffer = io.BytesIO()
+        self.enhance_page(image).save(buffer, "PDF", resolution=float(self.dpi))
+        return buffer.getvalue()
+    
+    def _log_enhanced(self, index, future):
+        """Wait for one page's enhancement, surfacing any error it raised"""
+        future.result()
+        self.logger.info(f"Enhanced page {index+1}")
+    
     def merge_nearby_text(self, items, merge_threshold=20):
         """Merge text items that are close together"""
         if not items:
             return items
             
+        # Pull the fields the merge test needs into arrays once per item
+        bboxes = [item.get('bbox') or {} for item in items]
+        pages = np.array([item.get('page', 0) for item in items], dtype=np.float64)
+        tops = np.array([b.get('top', 0) for b in bboxes], dtype=np.float64)
+        lefts = np.array([b.get('left', 0) for b in bboxes], dtype=np.float64)
+        rights = np.array([b.get('right', 0) for b in bboxes], dtype=np.float64)
+        has_bbox = np.array([bool(b) for b in bboxes])
+        
         # Sort items by page, then by top position, then by left position
-        sorted_items = sorted(items, key=lambda x: (
-            x.get('page', 0),
-            -x.get('bbox', {}).get('top', 0),
-            x.get('bbox', {}).get('left', 0)
-        ))
+        order = np.lexsort((lefts, -tops, pages))
+        pages, tops, lefts, rights, has_bbox = (
+            a[order] for a in (pages, tops, lefts, rights, has_bbox)
+        )
         
-        merged_items = []
-        current_group = [sorted_items[0]]
+        # Each item merges into its predecessor if on the same page and line
+        # (small vertical distance) and close horizontally
+        h_dist = lefts[1:] - rights[:-1]
+        merges = (
+            (pages[1:] == pages[:-1]) & has_bbox[1:] & has_bbox[:-1] &
+            (np.abs(tops[1:] - tops[:-1]) < 5) &
+            (h_dist >= 0) & (h_dist < merge_threshold)
+        )
         
-        for i in range(1, len(sorted_items)):
-            item = sorted_items[i]
-            last_item = current_group[-1]
-            
-            # Check if items should be merged
-            if (item.get('page') == last_item.get('page') and
-                item.get('bbox') and last_item.get('bbox')):
-                
-                # Calculate vertical and horizontal distance
-                v_dist = abs(item['bbox']['top'] - last_item['bbox']['top'])
-                h_dist = item['bbox']['left'] - (last_item['bbox']['right'])
-                
-                # Merge if on same line (small vertical distance) and close horizontally
-                if v_dist < 5 and 0 <= h_dist < merge_threshold:
-                    current_group.append(item)
-                else:
-                    # Process current group
-                    if len(current_group) > 1:
-                        merged_items.append(self.merge_group(current_group))
-                    else:
-                        merged_items.append(current_group[0])
-                    current_group = [item]
-            else:
-                # Different page or no bbox info
-                if len(current_group) > 1:
-                    merged_items.append(self.merge_group(current_group))
-                else:
-                    merged_items.append(current_group[0])
-                current_group = [item]
+        # Groups are the runs between non-merging neighbours
+        bounds = [0] + (np.flatnonzero(~merges) + 1).tolist() + [len(items)]
+        order = order.tolist()
         
-        # Process last group
-        if len(current_group) > 1:
-            merged_items.append(self.merge_group(current_group))
-        else:
-            merged_items.append(current_group[0])
+        merged_items = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end - start > 1:
+                merged_items.append(self.merge_group([items[i] for i in order[start:end]]))
+            else:
+                merged_items.append(items[order[start]])
         
         return merged_items
     
     def merge_group(self, group):
         """Merge a group of items into a single item"""
-        # Combine content with spaces
-        content = ' '.join(item.get('content', '') for item in group)
-        
-        # Calculate combined bbox
-        left = min(item['bbox']['left'] for item in group if item.get('bbox'))
-        right = max(item['bbox']['right'] for item in group if item.get('bbox'))
-        top = max(item['bbox']['top'] for item in group if item.get('bbox'))
-        bottom = min(item['bbox']['bottom'] for item in group if item.get('bbox'))
+        # Combine content and bbox extents in one pass over the group
+        content_parts = []
+        left = bottom = float('inf')
+        right = top = float('-inf')
+        for item in group:
+            content_parts.append(item.get('content', ''))
+            bbox = item.get('bbox')
+            if bbox:
+                left = min(left, bbox['left'])
+                right = max(right, bbox['right'])
+                top = max(top, bbox['top'])
+                bottom = min(bottom, bbox['bottom'])
         
         # Use first item as template
         merged = group[0].copy()
-        merged['content'] = content
+        merged['content'] = ' '.join(content_parts)
         merged['bbox'] = {
             'left': left,
             'top': top,
@@ -215,28 +356,23 @@ class EnhancedChonker2(Chonker2):
         
         return merged
     
-    def extract_to_json(self, pdf_path: str, output_path: str = None):
+    def extract_to_json(self, pdf_path: str, output_path: str = None, force: bool = False):
         """Extract with preprocessing and post-processing"""
-        # Preprocess PDF if enabled
-        processed_pdf = self.preprocess_pdf(pdf_path)
-        
-        # Add extra logging for OCR engine detection
-        import logging
-        # Temporarily increase logging level to see OCR details
-        docling_logger = logging.getLogger('docling')
-        original_level = docling_logger.level
-        docling_logger.setLevel(logging.DEBUG)
+        pdf_path = Path(pdf_path)
+        if not pdf_path.exists():
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
         
-        # Also log pypdftools and other OCR-related modules
-        for logger_name in ['docling.backend', 'docling.pipeline', 'pypdfium2', 'ocrmac', 'tesseract', 'rapidocr', 'easyocr']:
-            logger = logging.getLogger(logger_name)
-            logger.setLevel(logging.DEBUG)
+        # Check the cache against the original PDF; the enhanced PDF is
+        # rewritten on every run, so it would always look newer than the JSON
+        output_file = self._output_file(pdf_path, output_path)
+        result = self._load_if_current(pdf_path, output_file, force)
         
-        # Extract using parent class
-        result = super().extract_to_json(processed_pdf, output_path)
-        
-        # Restore original logging level
-        docling_logger.setLevel(original_level)
+        if result is None:
+            # Preprocess PDF if enabled
+            processed_pdf = self.preprocess_pdf(pdf_path)
+            
+            # Extract using parent class
+            result = super().extract_to_json(processed_pdf, str(output_file), force=True)
         
         # Post-process to merge nearby text
         if result and 'items' in result:
@@ -245,9 +381,18 @@ class EnhancedChonker2(Chonker2):
             result['items'] = self.merge_nearby_text(result['items'])
             merged_count = len(result['items'])
             self.logger.info(f"Merged {original_count - merged_count} items")
-        
+
         return result
 
+    def extract_many(self, pdf_files, output_dir=None, force: bool = False):
+        """Extract PDFs one at a time, since each is preprocessed separately"""
+        for pdf_file in pdf_files:
+            output_path = Path(output_dir) / f"{Path(pdf_file).stem}.json" if output_dir else None
+            try:
+                yield pdf_file, self.extract_to_json(pdf_file, output_path, force), None
+            except Exception as e:
+                yield pdf_file, None, str(e)
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(
@@ -257,13 +402,15 @@ def main():
     parser.add_argument('-o', '--output', help='Output JSON file')
     parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose logging')
     parser.add_argument('--no-preprocess', action='store_true', help='Disable preprocessing')
+    parser.add_argument('--dpi', type=int, default=200, help='Render resolution for preprocessing (default: 200)')
     
     args = parser.parse_args()
     
     # Create enhanced extractor
     extractor = EnhancedChonker2(
         verbose=args.verbose,
-        preprocess=not args.no_preprocess
+        preprocess=not args.no_preprocess,
+        dpi=args.dpi
     )
     
     # Process file
@@ -3,13 +3,19 @@
 Extract and analyze - helps identify if issues are in extraction or rendering
 """
 
+import os
+import re
 import subprocess
 import sys
 import json
 import time
+import tempfile
 from pathlib import Path
 from datetime import datetime
 
+# Quoted .json path in an extractor's output line
+JSON_PATH_RE = re.compile(r'["\']([^"\']*\.json)["\']')
+
 def run_extraction(pdf_path):
     """Run the extraction and return JSON path"""
     print(f"📄 Extracting: {pdf_path}")
@@ -40,24 +46,22 @@ def run_extraction(pdf_path):
                 # Look for json_path in output
                 for line in output.split('\n'):
                     if 'json_path' in line and '.json' in line:
-                        import re
-                        match = re.search(r'["\']([^"\']*\.json)["\']', line)
+                        match = JSON_PATH_RE.search(line)
                         if match:
                             json_path = match.group(1)
                             print(f"📋 JSON saved to: {json_path}")
                             return json_path
                             
                 # If not found in output, check temp directory
-                import tempfile
-                import os
                 temp_dir = tempfile.gettempdir()
-                for file in os.listdir(temp_dir):
-                    if file.endswith('_chonker3.json') and file.startswith('tmp'):
-                        full_path = os.path.join(temp_dir, file)
-                        # Check if recent (within last minute)
-                        if time.time() - os.path.getmtime(full_path) < 60:
-                            print(f"📋 Found JSON: {full_path}")
-                            return full_path
+                # scandir entries carry their names, so only candidates are stat'ed
+                with os.scandir(temp_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('_chonker3.json') and entry.name.startswith('tmp'):
+                            # Check if recent (within last minute)
+                            if time.time() - entry.stat().st_mtime < 60:
+                                print(f"📋 Found JSON: {entry.path}")
+                                return entry.path
                             
             else:
                 print(f"❌ Extraction failed: {result.stderr}")
@@ -111,16 +115,24 @@ def analyze_json(json_path):
             items_by_page[page] = []
         items_by_page[page].append(item)
         
+    # Hash positions into 5pt grid cells; a pair within 5pt on both axes
+    # can only sit in the same or a neighbouring cell, so each item is
+    # compared against a few nearby items instead of the whole page
     for page_items in items_by_page.values():
-        for i, item1 in enumerate(page_items):
-            for item2 in page_items[i+1:]:
-                bbox1 = item1.get('bbox', {})
-                bbox2 = item2.get('bbox', {})
-                
-                # Simple overlap check
-                if (abs(bbox1.get('left', 0) - bbox2.get('left', 0)) < 5 and
-                    abs(bbox1.get('top', 0) - bbox2.get('top', 0)) < 5):
-                    overlap_count += 1
+        grid = {}
+        for item in page_items:
+            bbox = item.get('bbox', {})
+            left = bbox.get('left', 0)
+            top = bbox.get('top', 0)
+            cx, cy = int(left // 5), int(top // 5)
+            
+            # Simple overlap check
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for other_left, other_top in grid.get((cx + dx, cy + dy), ()):
+                        if abs(left - other_left) < 5 and abs(top - other_top) < 5:
+                            overlap_count += 1
+            grid.setdefault((cx, cy), []).append((left, top))
                     
     if overlap_count > 10:
         issues.append(f"⚠️  Many overlapping items ({overlap_count})")
@@ -10,11 +10,103 @@ from pathlib import Path
 from datetime import datetime
 import subprocess
 import math
+from collections import Counter
+
+import numpy as np
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    from rtree import index as rtree_index
+    HAS_RTREE = True
+except ImportError:
+    HAS_RTREE = False
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Pages with fewer items than this are checked pair by pair; an R-tree
+# only pays for its construction on busier pages
+RTREE_MIN_ITEMS = 32
+
+# Candidate pairs tested per vectorized batch when checking every pair
+PAIR_BATCH = 1 << 20
+
+# Pages with more items than this go through the compiled all-pairs kernel
+NUMBA_MIN_ITEMS = 200
+
+# Pages with at least this many items are swept instead; past this size
+# an O(n log n) sort beats both the all-pairs kernel and R-tree insertion
+SWEEP_MIN_ITEMS = 10000
+
+
+def _pair_overlap(l1, t1, w1, h1, l2, t2, w2, h2):
+    """(overlaps, overlap area, smaller box area) for one pair of boxes"""
+    min_area = min(w1 * h1, w2 * h2)
+    if l1 + w1 <= l2 or l2 + w2 <= l1 or t1 + h1 <= t2 or t2 + h2 <= t1:
+        return False, 0.0, min_area
+    x1 = max(l1, l2)
+    y1 = max(t1, t2)
+    x2 = min(l1 + w1, l2 + w2)
+    y2 = min(t1 + h1, t2 + h2)
+    if x2 > x1 and y2 > y1:
+        return True, (x2 - x1) * (y2 - y1), min_area
+    return True, 0.0, min_area
+
+
+def _significant_overlaps_loop(L, T, W, H):
+    """All-pairs overlap check returning (i, j, percent) of significant overlaps
+    
+    Counts each row's hits first so the second pass can write them straight
+    into exactly-sized outputs; both passes run rows in parallel.
+    """
+    n = L.shape[0]
+    counts = np.zeros(n, dtype=np.int64)
+    for i in prange(n):
+        c = 0
+        for j in range(i + 1, n):
+            hit, area, min_area = _pair_overlap(L[i], T[i], W[i], H[i], L[j], T[j], W[j], H[j])
+            if hit and area > min_area * 0.5:
+                c += 1
+        counts[i] = c
+        
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(counts)
+    out_i = np.empty(offsets[n], dtype=np.int64)
+    out_j = np.empty(offsets[n], dtype=np.int64)
+    out_percent = np.empty(offsets[n], dtype=np.float64)
+    for i in prange(n):
+        k = offsets[i]
+        for j in range(i + 1, n):
+            hit, area, min_area = _pair_overlap(L[i], T[i], W[i], H[i], L[j], T[j], W[j], H[j])
+            if hit and area > min_area * 0.5:
+                out_i[k] = i
+                out_j[k] = j
+                out_percent[k] = area / min_area * 100
+                k += 1
+    return out_i, out_j, out_percent
+
+
+if HAS_NUMBA:
+    _pair_overlap = njit(cache=True)(_pair_overlap)
+    _significant_overlaps = njit(cache=True, parallel=True, error_model='numpy')(_significant_overlaps_loop)
 
 class ExtractionAnalyzer:
-    def __init__(self, json_path):
+    def __init__(self, json_path, open_report=True):
         self.json_path = Path(json_path)
+        # Open the HTML report in the browser once written
+        self.open_report = open_report
         self.data = None
+        # self.data['items'] / self.data['pages'], set by load_json
+        self.items = []
+        self.pages = []
         self.issues = []
         self.warnings = []
         self.stats = {}
@@ -22,8 +114,13 @@ class ExtractionAnalyzer:
     def load_json(self):
         """Load and validate JSON"""
         try:
-            with open(self.json_path, 'r') as f:
-                self.data = json.load(f)
+            if HAS_ORJSON:
+                self.data = orjson.loads(self.json_path.read_bytes())
+            else:
+                with open(self.json_path, 'r') as f:
+                    self.data = json.load(f)
+            self.items = self.data.get('items', [])
+            self.pages = self.data.get('pages', [])
             return True
         except Exception as e:
             print(f"❌ Failed to load JSON: {e}")
@@ -33,6 +130,7 @@ class ExtractionAnalyzer:
         """Run all analysis checks"""
         if not self.load_json():
             return
+        self._build_arrays()
             
         print(f"📄 Analyzing: {self.json_path}")
         print("=" * 60)
@@ -50,6 +148,16 @@ class ExtractionAnalyzer:
         # Generate report
         self.generate_report()
         
+    def _build_arrays(self):
+        """Parse the per-item fields the checks share into parallel arrays, once"""
+        items = self.items
+        self._bboxes = [item.get('bbox', {}) or {} for item in items]
+        self._has_bbox = np.array([bool(bbox) for bbox in self._bboxes], dtype=bool)
+        self._L, self._T, self._W, self._H = self._extract_bbox_arrays(self._bboxes)
+        self._pages = np.array([item.get('page', 1) for item in items])
+        self._types = [item.get('type', 'Unknown') for item in items]
+        self._contents = [item.get('content', '').strip() for item in items]
+        
     def check_structure(self):
         """Check JSON structure"""
         print("\n🔍 Checking JSON structure...")
@@ -62,7 +170,7 @@ class ExtractionAnalyzer:
                 self.stats[f"{field}_count"] = len(self.data.get(field, []))
                 
         # Check item structure
-        items = self.data.get('items', [])
+        items = self.items
         if items:
             sample_item = items[0]
             expected_fields = ['content', 'bbox', 'page', 'type']
@@ -71,51 +179,39 @@ class ExtractionAnalyzer:
                     self.warnings.append(f"Items missing field: {field}")
                     
         print(f"  ✓ Found {len(items)} items")
-        print(f"  ✓ Found {len(self.data.get('pages', []))} pages")
+        print(f"  ✓ Found {len(self.pages)} pages")
         
     def check_coordinates(self):
         """Check coordinate system and values"""
         print("\n🔍 Checking coordinates...")
         
-        items = self.data.get('items', [])
+        items = self.items
         if not items:
             return
             
-        # Track coordinate stats
-        min_x = min_y = float('inf')
-        max_x = max_y = float('-inf')
-        coord_systems = set()
-        negative_coords = []
-        huge_coords = []
-        
-        for i, item in enumerate(items):
-            bbox = item.get('bbox', {})
-            if not bbox:
-                self.issues.append(f"Item {i} missing bbox")
-                continue
-                
-            left = bbox.get('left', 0)
-            top = bbox.get('top', 0)
-            width = bbox.get('width', 0)
-            height = bbox.get('height', 0)
-            
-            # Track coordinate system
-            coord_origin = bbox.get('coord_origin', 'UNKNOWN')
-            coord_systems.add(coord_origin)
-            
-            # Check for negative coordinates
-            if left < 0 or top < 0:
-                negative_coords.append(f"Item {i}: left={left}, top={top}")
-                
-            # Check for huge coordinates (likely errors)
-            if left > 1000 or top > 2000:
-                huge_coords.append(f"Item {i}: left={left}, top={top}")
-                
-            # Track bounds
-            min_x = min(min_x, left)
-            min_y = min(min_y, top)
-            max_x = max(max_x, left + width)
-            max_y = max(max_y, top + height)
+        for i in np.flatnonzero(~self._has_bbox).tolist():
+            self.issues.append(f"Item {i} missing bbox")
+            
+        # Track coordinate system
+        coord_systems = {bbox.get('coord_origin', 'UNKNOWN') for bbox in self._bboxes if bbox}
+        
+        # Coordinate stats as whole-array reductions
+        present = self._has_bbox
+        L, T, W, H = self._L[present], self._T[present], self._W[present], self._H[present]
+        
+        # Check for negative coordinates
+        negative_count = int(np.count_nonzero((L < 0) | (T < 0)))
+        
+        # Check for huge coordinates (likely errors)
+        huge_count = int(np.count_nonzero((L > 1000) | (T > 2000)))
+        
+        # Track bounds
+        if present.any():
+            min_x, min_y = L.min(), T.min()
+            max_x, max_y = (L + W).max(), (T + H).max()
+        else:
+            min_x = min_y = float('inf')
+            max_x = max_y = float('-inf')
             
         print(f"  ✓ Coordinate systems found: {coord_systems}")
         print(f"  ✓ Bounds: X({min_x:.1f} - {max_x:.1f}), Y({min_y:.1f} - {max_y:.1f})")
@@ -123,24 +219,22 @@ class ExtractionAnalyzer:
         if len(coord_systems) > 1:
             self.issues.append(f"Mixed coordinate systems: {coord_systems}")
             
-        if negative_coords:
-            self.issues.append(f"Found {len(negative_coords)} items with negative coordinates")
+        if negative_count:
+            self.issues.append(f"Found {negative_count} items with negative coordinates")
             
-        if huge_coords:
-            self.warnings.append(f"Found {len(huge_coords)} items with very large coordinates")
+        if huge_count:
+            self.warnings.append(f"Found {huge_count} items with very large coordinates")
             
     def check_text_content(self):
         """Check text extraction quality"""
         print("\n🔍 Checking text content...")
         
-        items = self.data.get('items', [])
+        items = self.items
         empty_items = []
         total_chars = 0
         suspicious_chars = []
         
-        for i, item in enumerate(items):
-            content = item.get('content', '').strip()
-            
+        for i, content in enumerate(self._contents):
             if not content:
                 empty_items.append(i)
                 continue
@@ -152,7 +246,7 @@ class ExtractionAnalyzer:
                 suspicious_chars.append(f"Item {i}: replacement character found")
             if content.count(' ') > len(content) * 0.5:
                 suspicious_chars.append(f"Item {i}: excessive spaces")
-            if all(c == content[0] for c in content) and len(content) > 3:
+            if len(content) > 3 and content.count(content[0]) == len(content):
                 suspicious_chars.append(f"Item {i}: repeated character: '{content[:20]}...'")
                 
         print(f"  ✓ Total characters extracted: {total_chars}")
@@ -171,96 +265,163 @@ class ExtractionAnalyzer:
         """Check for overlapping items"""
         print("\n🔍 Checking for overlaps...")
         
-        items = self.data.get('items', [])
         overlaps = []
         
         # Group by page
         pages = {}
-        for item in items:
-            page = item.get('page', 1)
+        for i, page in enumerate(self._pages.tolist()):
             if page not in pages:
                 pages[page] = []
-            pages[page].append(item)
+            pages[page].append(i)
             
         # Check overlaps per page
         for page, page_items in pages.items():
-            for i, item1 in enumerate(page_items):
-                bbox1 = item1.get('bbox', {})
-                if not bbox1:
-                    continue
-                    
-                for j, item2 in enumerate(page_items[i+1:], i+1):
-                    bbox2 = item2.get('bbox', {})
-                    if not bbox2:
-                        continue
-                        
-                    # Check if bboxes overlap
-                    if self._boxes_overlap(bbox1, bbox2):
-                        overlap_area = self._overlap_area(bbox1, bbox2)
-                        area1 = bbox1.get('width', 0) * bbox1.get('height', 0)
-                        area2 = bbox2.get('width', 0) * bbox2.get('height', 0)
+            page_items = np.array(page_items)
+            L, T, W, H = self._L[page_items], self._T[page_items], self._W[page_items], self._H[page_items]
+            present = self._has_bbox[page_items]
+            
+            if HAS_NUMBA and NUMBA_MIN_ITEMS < present.sum() < SWEEP_MIN_ITEMS:
+                present = np.flatnonzero(present)
+                i, j, percents = _significant_overlaps(L[present], T[present], W[present], H[present])
+                for a, b, percent in zip(present[i].tolist(), present[j].tolist(), percents.tolist()):
+                    overlaps.append({
+                        'page': page,
+                        'items': (a, b),
+                        'overlap_percent': percent
+                    })
+                continue
+                
+            for i, j in self._candidate_pairs(L, T, W, H, present):
+                # Check if bboxes overlap
+                hit = self._boxes_overlap(L[i], T[i], W[i], H[i], L[j], T[j], W[j], H[j])
+                i, j = i[hit], j[hit]
+                overlap_area = self._overlap_area(L[i], T[i], W[i], H[i], L[j], T[j], W[j], H[j])
+                min_area = np.minimum(W[i] * H[i], W[j] * H[j])
+                
+                # Only report significant overlaps
+                significant = overlap_area > min_area * 0.5
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    percents = overlap_area[significant] / min_area[significant] * 100
+                for a, b, percent in zip(i[significant].tolist(), j[significant].tolist(), percents.tolist()):
+                    overlaps.append({
+                        'page': page,
+                        'items': (a, b),
+                        'overlap_percent': percent
+                    })
                         
-                        # Only report significant overlaps
-                        if overlap_area > min(area1, area2) * 0.5:
-                            overlaps.append({
-                                'page': page,
-                                'items': (i, j),
-                                'overlap_percent': (overlap_area / min(area1, area2)) * 100
-                            })
-                            
         print(f"  ✓ Found {len(overlaps)} significant overlaps")
         
         if len(overlaps) > 10:
             self.issues.append(f"Many overlapping items ({len(overlaps)}) - possible extraction issue")
             
-    def _boxes_overlap(self, bbox1, bbox2):
-        """Check if two bounding boxes overlap"""
-        return not (bbox1.get('left', 0) + bbox1.get('width', 0) <= bbox2.get('left', 0) or
-                   bbox2.get('left', 0) + bbox2.get('width', 0) <= bbox1.get('left', 0) or
-                   bbox1.get('top', 0) + bbox1.get('height', 0) <= bbox2.get('top', 0) or
-                   bbox2.get('top', 0) + bbox2.get('height', 0) <= bbox1.get('top', 0))
+    def _extract_bbox_arrays(self, bboxes):
+        """Split bbox dicts into float64 (left, top, width, height) arrays"""
+        return tuple(
+            np.array([bbox.get(key, 0) for bbox in bboxes], dtype=np.float64)
+            for key in ('left', 'top', 'width', 'height')
+        )
+        
+    def _candidate_pairs(self, L, T, W, H, present):
+        """Yield batches of index arrays (i, j), i < j, of bboxes that may overlap
+        
+        Very large pages are swept along one axis, busy pages go through an
+        R-tree so only boxes whose envelopes touch are paired; otherwise every
+        pair of present bboxes is a candidate.
+        """
+        present = np.flatnonzero(present)
+        n = len(present)
+        
+        if n >= SWEEP_MIN_ITEMS:
+            order, counts = self._sweep_windows(L[present], T[present], W[present], H[present])
+            for i, j in self._row_pairs(counts):
+                a, b = present[order[i]], present[order[j]]
+                yield np.minimum(a, b), np.maximum(a, b)
+            return
+            
+        if not HAS_RTREE or n < RTREE_MIN_ITEMS:
+            for i, j in self._row_pairs(n - 1 - np.arange(n)):
+                yield present[i], present[j]
+            return
+            
+        L, T = L[present], T[present]
+        R, B = L + W[present], T + H[present]
+        envelopes = np.column_stack((
+            np.minimum(L, R), np.minimum(T, B), np.maximum(L, R), np.maximum(T, B)
+        )).tolist()
+        
+        # Bulk-load the tree, then query each box's envelope
+        idx = rtree_index.Index((k, envelope, None) for k, envelope in enumerate(envelopes))
+        i, j = [], []
+        for k, envelope in enumerate(envelopes):
+            hits = sorted(h for h in idx.intersection(envelope) if h > k)
+            i.extend([k] * len(hits))
+            j.extend(hits)
+        yield present[np.array(i, dtype=np.intp)], present[np.array(j, dtype=np.intp)]
+                
+    def _sweep_windows(self, L, T, W, H):
+        """Sort-and-sweep boxes along whichever axis gives fewer candidates
+        
+        Returns (order, counts): with boxes sorted by their start on that
+        axis, box order[k] may only overlap the counts[k] boxes right after it,
+        since every later box starts at or past its end.
+        """
+        best = None
+        for start, size in ((L, W), (T, H)):
+            lo = np.minimum(start, start + size)
+            hi = np.maximum(start, start + size)
+            order = np.argsort(lo, kind='stable')
+            ends = np.searchsorted(lo[order], hi[order], side='left')
+            counts = np.maximum(ends - np.arange(len(order)) - 1, 0)
+            if best is None or counts.sum() < best[1].sum():
+                best = (order, counts)
+        return best
+        
+    def _row_pairs(self, counts):
+        """Yield (i, j) batches pairing each row r with rows r+1 .. r+counts[r]
+        
+        Rows are taken in blocks of about PAIR_BATCH pairs so a large page
+        never materializes all of its pairs at once.
+        """
+        n = len(counts)
+        totals = np.cumsum(counts)
+        start = 0
+        while start < n:
+            done = totals[start - 1] if start else 0
+            stop = max(int(np.searchsorted(totals, done + PAIR_BATCH, side='right')), start + 1)
+            r = np.arange(start, stop)
+            c = counts[start:stop]
+            offsets = np.cumsum(c) - c
+            yield np.repeat(r, c), np.arange(c.sum()) - np.repeat(offsets - r - 1, c)
+            start = stop
+            
+    def _boxes_overlap(self, L1, T1, W1, H1, L2, T2, W2, H2):
+        """Check which pairs of bounding boxes overlap"""
+        return ~((L1 + W1 <= L2) | (L2 + W2 <= L1) |
+                 (T1 + H1 <= T2) | (T2 + H2 <= T1))
                    
-    def _overlap_area(self, bbox1, bbox2):
-        """Calculate overlap area between two boxes"""
-        x1 = max(bbox1.get('left', 0), bbox2.get('left', 0))
-        y1 = max(bbox1.get('top', 0), bbox2.get('top', 0))
-        x2 = min(bbox1.get('left', 0) + bbox1.get('width', 0),
-                 bbox2.get('left', 0) + bbox2.get('width', 0))
-        y2 = min(bbox1.get('top', 0) + bbox1.get('height', 0),
-                 bbox2.get('top', 0) + bbox2.get('height', 0))
-        
-        if x2 > x1 and y2 > y1:
-            return (x2 - x1) * (y2 - y1)
-        return 0
+    def _overlap_area(self, L1, T1, W1, H1, L2, T2, W2, H2):
+        """Calculate overlap area between pairs of boxes"""
+        x1 = np.maximum(L1, L2)
+        y1 = np.maximum(T1, T2)
+        x2 = np.minimum(L1 + W1, L2 + W2)
+        y2 = np.minimum(T1 + H1, T2 + H2)
+        
+        return np.where((x2 > x1) & (y2 > y1), (x2 - x1) * (y2 - y1), 0.0)
         
     def check_ordering(self):
         """Check if items are in reading order"""
         print("\n🔍 Checking item ordering...")
         
-        items = self.data.get('items', [])
+        items = self.items
         if not items:
             return
             
-        # Check if items are roughly in top-to-bottom, left-to-right order
-        order_issues = 0
-        
-        for i in range(1, len(items)):
-            prev = items[i-1]
-            curr = items[i]
-            
-            # Skip if different pages
-            if prev.get('page', 1) != curr.get('page', 1):
-                continue
-                
-            prev_bbox = prev.get('bbox', {})
-            curr_bbox = curr.get('bbox', {})
-            
-            prev_y = prev_bbox.get('top', 0)
-            curr_y = curr_bbox.get('top', 0)
-            
-            # If current item is significantly above previous (more than a line height)
-            if curr_y < prev_y - 20:
-                order_issues += 1
+        # Check if items are roughly in top-to-bottom, left-to-right order:
+        # count consecutive items on the same page where the current item is
+        # significantly above the previous one (more than a line height)
+        same_page = self._pages[1:] == self._pages[:-1]
+        moved_up = self._T[1:] < self._T[:-1] - 20
+        order_issues = int(np.count_nonzero(same_page & moved_up))
                 
         print(f"  ✓ Found {order_issues} potential ordering issues")
         
@@ -271,12 +432,8 @@ class ExtractionAnalyzer:
         """Check item type distribution"""
         print("\n🔍 Checking item types...")
         
-        items = self.data.get('items', [])
-        type_counts = {}
-        
-        for item in items:
-            item_type = item.get('type', 'Unknown')
-            type_counts[item_type] = type_counts.get(item_type, 0) + 1
+        items = self.items
+        type_counts = Counter(self._types)
             
         print("  ✓ Type distribution:")
         for item_type, count in sorted(type_counts.items()):
@@ -290,7 +447,7 @@ class ExtractionAnalyzer:
         """Check font information"""
         print("\n🔍 Checking font information...")
         
-        items = self.data.get('items', [])
+        items = self.items
         items_with_font = 0
         font_sizes = []
         
@@ -313,7 +470,7 @@ class ExtractionAnalyzer:
         """Check page information"""
         print("\n🔍 Checking page information...")
         
-        pages = self.data.get('pages', [])
+        pages = self.pages
         if not pages:
             self.issues.append("No page information found")
             return
@@ -328,52 +485,55 @@ class ExtractionAnalyzer:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         report_path = self.json_path.parent / f"extraction_analysis_{timestamp}.txt"
         
-        with open(report_path, 'w') as f:
-            f.write("EXTRACTION ANALYSIS REPORT\n")
-            f.write("=" * 60 + "\n\n")
-            f.write(f"JSON file: {self.json_path}\n")
-            f.write(f"Analysis time: {datetime.now()}\n\n")
-            
-            # Summary
-            f.write("SUMMARY\n")
-            f.write("-" * 30 + "\n")
-            f.write(f"Total items: {self.stats.get('items_count', 0)}\n")
-            f.write(f"Total pages: {self.stats.get('pages_count', 0)}\n")
-            f.write(f"Issues found: {len(self.issues)}\n")
-            f.write(f"Warnings: {len(self.warnings)}\n\n")
-            
-            # Issues
-            if self.issues:
-                f.write("CRITICAL ISSUES (likely extraction problems)\n")
-                f.write("-" * 30 + "\n")
-                for issue in self.issues:
-                    f.write(f"❌ {issue}\n")
-                f.write("\n")
-                
-            # Warnings
-            if self.warnings:
-                f.write("WARNINGS (may affect quality)\n")
-                f.write("-" * 30 + "\n")
-                for warning in self.warnings:
-                    f.write(f"⚠️  {warning}\n")
-                f.write("\n")
-                
-            # Recommendations
-            f.write("RECOMMENDATIONS\n")
-            f.write("-" * 30 + "\n")
-            
-            if self.issues:
-                f.write("The extraction has critical issues that need to be fixed:\n")
-                for issue in self.issues:
-                    if "coordinate" in issue.lower():
-                        f.write("- Check coordinate system conversion in the extractor\n")
-                    elif "text" in issue.lower():
-                        f.write("- Review text extraction logic, may need different PDF library\n")
-                    elif "overlap" in issue.lower():
-                        f.write("- Text blocks may be incorrectly merged or split\n")
-            else:
-                f.write("✅ Extraction appears to be working correctly!\n")
-                f.write("   Any display issues are likely in the rendering (Chonker3) side.\n")
+        report = []
+        report.append("EXTRACTION ANALYSIS REPORT\n")
+        report.append("=" * 60 + "\n\n")
+        report.append(f"JSON file: {self.json_path}\n")
+        report.append(f"Analysis time: {datetime.now()}\n\n")
+        
+        # Summary
+        report.append("SUMMARY\n")
+        report.append("-" * 30 + "\n")
+        report.append(f"Total items: {self.stats.get('items_count', 0)}\n")
+        report.append(f"Total pages: {self.stats.get('pages_count', 0)}\n")
+        report.append(f"Issues found: {len(self.issues)}\n")
+        report.append(f"Warnings: {len(self.warnings)}\n\n")
+        
+        # Issues
+        if self.issues:
+            report.append("CRITICAL ISSUES (likely extraction problems)\n")
+            report.append("-" * 30 + "\n")
+            for issue in self.issues:
+                report.append(f"❌ {issue}\n")
+            report.append("\n")
+            
+        # Warnings
+        if self.warnings:
+            report.append("WARNINGS (may affect quality)\n")
+            report.append("-" * 30 + "\n")
+            for warning in self.warnings:
+                report.append(f"⚠️  {warning}\n")
+            report.append("\n")
+            
+        # Recommendations
+        report.append("RECOMMENDATIONS\n")
+        report.append("-" * 30 + "\n")
+        
+        if self.issues:
+            report.append("The extraction has critical issues that need to be fixed:\n")
+            for issue in self.issues:
+                if "coordinate" in issue.lower():
+                    report.append("- Check coordinate system conversion in the extractor\n")
+                elif "text" in issue.lower():
+                    report.append("- Review text extraction logic, may need different PDF library\n")
+                elif "overlap" in issue.lower():
+                    report.append("- Text blocks may be incorrectly merged or split\n")
+        else:
+            report.append("✅ Extraction appears to be working correctly!\n")
+            report.append("   Any display issues are likely in the rendering (Chonker3) side.\n")
+            
+        # Encode once and write in a single call
+        report_path.write_bytes(''.join(report).encode('utf-8'))
                 
         print(f"\n📄 Report saved to: {report_path}")
         
@@ -387,7 +547,8 @@ class ExtractionAnalyzer:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         html_path = self.json_path.parent / f"extraction_visual_{timestamp}.html"
         
-        html = """<!DOCTYPE html>
+        # Collect the page in pieces and join once at the end
+        html = ["""<!DOCTYPE html>
 <html>
 <head>
     <title>Extraction Visualization</title>
@@ -428,11 +589,11 @@ class ExtractionAnalyzer:
         <h3>Extraction Info</h3>
         <div id="details"></div>
     </div>
-"""
+"""]
         
         # Add pages
-        pages = self.data.get('pages', [{'width': 612, 'height': 792}])
-        items = self.data.get('items', [])
+        pages = self.pages if 'pages' in self.data else [{'width': 612, 'height': 792}]
+        items = self.items
         
         # Group items by page
         items_by_page = {}
@@ -449,8 +610,8 @@ class ExtractionAnalyzer:
             # Scale to fit screen
             scale = min(800 / page_width, 1000 / page_height)
             
-            html += f'<div class="page" style="width:{page_width*scale}px;height:{page_height*scale}px;">\n'
-            html += f'<div style="position:absolute;top:5px;left:5px;color:#999;">Page {i+1}</div>\n'
+            html.append(f'<div class="page" style="width:{page_width*scale}px;height:{page_height*scale}px;">\n')
+            html.append(f'<div style="position:absolute;top:5px;left:5px;color:#999;">Page {i+1}</div>\n')
             
             # Add items
             for item in items_by_page.get(i, []):
@@ -467,13 +628,15 @@ class ExtractionAnalyzer:
                 if 'BOTTOMLEFT' in bbox.get('coord_origin', ''):
                     top = (page_height - bbox.get('top', 0) - bbox.get('height', 0)) * scale
                     
-                html += f'<div class="item {item_type}" '
-                html += f'style="left:{left}px;top:{top}px;width:{width}px;height:{height}px;" '
-                html += f'data-info="{content}" onclick="showInfo(this)">{content}</div>\n'
+                html.append(
+                    f'<div class="item {item_type}" '
+                    f'style="left:{left}px;top:{top}px;width:{width}px;height:{height}px;" '
+                    f'data-info="{content}" onclick="showInfo(this)">{content}</div>\n'
+                )
                 
-            html += '</div>\n'
+            html.append('</div>\n')
             
-        html += """
+        html.append("""
 <script>
 function showInfo(elem) {
     document.getElementById('details').innerHTML = 
@@ -482,22 +645,27 @@ function showInfo(elem) {
 }
 </script>
 </body>
-</html>"""
+</html>""")
         
-        with open(html_path, 'w') as f:
-            f.write(html)
+        html_path.write_bytes(''.join(html).encode('utf-8'))
             
         print(f"🎨 Visual report saved to: {html_path}")
-        subprocess.run(["open", str(html_path)])
+        if self.open_report:
+            # Hand off to the launcher without waiting on it
+            subprocess.Popen(["open", str(html_path)],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python extraction_analyzer.py <json_file>")
+    args = [arg for arg in sys.argv[1:] if arg != '--no-open']
+    if not args:
+        print("Usage: python extraction_analyzer.py <json_file> [--no-open]")
         print("\nThis will analyze the extraction JSON to identify issues.")
         return
         
-    json_path = sys.argv[1]
-    analyzer = ExtractionAnalyzer(json_path)
+    json_path = args[0]
+    # Only pop the report open for an interactive run
+    open_report = '--no-open' not in sys.argv and sys.stdout.isatty()
+    analyzer = ExtractionAnalyzer(json_path, open_report=open_report)
     analyzer.analyze()
 
 if __name__ == "__main__":
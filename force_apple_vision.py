@@ -5,18 +5,9 @@ Force Apple Vision by temporarily hiding EasyOCR
 import sys
 import os
 
-# Hide easyocr from import
-class HideEasyOCR:
-    def find_module(self, fullname, path=None):
-        if fullname == 'easyocr' or fullname.startswith('easyocr.'):
-            return self
-        return None
-    
-    def load_module(self, fullname):
-        raise ImportError(f"EasyOCR hidden to force Apple Vision usage")
-
-# Install the import hook
-sys.meta_path.insert(0, HideEasyOCR())
+# Hide easyocr from import: a None entry in sys.modules makes any
+# `import easyocr` (or of its submodules) raise ImportError straight away
+sys.modules['easyocr'] = None
 
 # Now import and run enhanced_chonker2
 from enhanced_chonker2 import EnhancedChonker2
@@ -30,12 +30,16 @@ try:
     try:
         # Hide EasyOCR to force Apple Vision
         import sys
-        class HideEasyOCR:
-            def find_module(self, fullname, path=None):
+        import importlib.abc
+        import importlib.machinery
+        class HideEasyOCR(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+            def find_spec(self, fullname, path=None, target=None):
                 if fullname == 'easyocr' or fullname.startswith('easyocr.'):
-                    return self
+                    return importlib.machinery.ModuleSpec(fullname, self)
                 return None
-            def load_module(self, fullname):
+            def create_module(self, spec):
+                raise ImportError(f"EasyOCR hidden to force Apple Vision usage")
+            def exec_module(self, module):
                 raise ImportError(f"EasyOCR hidden to force Apple Vision usage")
         sys.meta_path.insert(0, HideEasyOCR())
         
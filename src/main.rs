@@ -349,6 +349,9 @@ impl eframe::App for Chonker3App {
             } else {
                 self.status_message = result.message.clone();
             }
+            
+            // Let automation scripts know extraction is finished
+            mark_extraction_done();
         }
         
         // Top panel
@@ -709,6 +712,16 @@ fn main() -> Result<(), eframe::Error> {
     )
 }
 
+/// Touch ~/.chonker3/last_extract_done so the automated dev loop can poll
+/// for completion instead of sleeping for a fixed time
+fn mark_extraction_done() {
+    if let Ok(home) = std::env::var("HOME") {
+        let dir = PathBuf::from(home).join(".chonker3");
+        let _ = std::fs::create_dir_all(&dir);
+        let _ = std::fs::write(dir.join("last_extract_done"), b"");
+    }
+}
+
 fn load_icon() -> egui::IconData {
     // Create a hamster face icon like the Google emoji
     let mut rgba = vec![0u8; 32 * 32 * 4];
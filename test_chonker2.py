@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the Chonker2 layout helpers (run with pytest)
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+import chonker2
+from chonker2 import (
+    COLUMN_GAP_THRESHOLD,
+    ROW_HEIGHT_ESTIMATE,
+    _assign_columns_bands,
+    _assign_columns_bands_loop,
+    _assign_columns_bands_numpy,
+)
+
+
+def random_pages(count=500, seed=0):
+    """Random item positions per page, including items left of x=0"""
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        n = int(rng.integers(1, 40))
+        # Rounded positions give ties, so the stable ordering is exercised too
+        lefts = rng.uniform(-200, 600, n).round(int(rng.integers(0, 3)))
+        tops = rng.uniform(0, 800, n)
+        yield lefts, tops
+
+
+def assert_same_layout(expected, actual):
+    for want, got in zip(expected, actual):
+        np.testing.assert_array_equal(want, got)
+
+
+def test_column_kernels_agree():
+    kernels = [_assign_columns_bands_loop]
+    if chonker2.HAS_NUMBA:
+        kernels.append(_assign_columns_bands)
+    
+    for lefts, tops in random_pages():
+        expected = _assign_columns_bands_numpy(lefts, tops, COLUMN_GAP_THRESHOLD, ROW_HEIGHT_ESTIMATE)
+        for kernel in kernels:
+            actual = kernel(lefts, tops, COLUMN_GAP_THRESHOLD, ROW_HEIGHT_ESTIMATE)
+            assert_same_layout(expected, actual)
+
+
+def test_negative_left_gets_a_column_after_a_negative_gap():
+    # The gap midpoint (-100) is left of x=0, so -20 still lands in column 1
+    lefts = np.array([-180.0, -20.0, 10.0])
+    tops = np.zeros(3)
+    for kernel in (_assign_columns_bands_numpy, _assign_columns_bands_loop):
+        gap_mids, columns, _, _ = kernel(lefts, tops, COLUMN_GAP_THRESHOLD, ROW_HEIGHT_ESTIMATE)
+        assert gap_mids.tolist() == [-100.0]
+        assert columns.tolist() == [-1, 1, 1]
+
+
+def test_relative_bbox_uses_the_items_page_size(tmp_path):
+    # Docling keys pages by page_no, and prov.page_no uses the same numbering
+    a4 = SimpleNamespace(page_no=1, size=SimpleNamespace(width=595.0, height=842.0))
+    letter = SimpleNamespace(page_no=2, size=SimpleNamespace(width=612.0, height=792.0))
+    
+    class TextItem:
+        def __init__(self, page_no):
+            self.text = "Heading"
+            self.prov = [SimpleNamespace(page_no=page_no, bbox=SimpleNamespace(
+                l=59.5, t=800.0, r=297.5, b=758.0, coord_origin='CoordOrigin.BOTTOMLEFT'))]
+    
+    class Document:
+        pages = {1: a4, 2: letter}
+        
+        def iterate_items(self):
+            yield TextItem(1), 0
+            yield TextItem(2), 0
+    
+    pdf_path = tmp_path / "doc.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4\n")
+    extractor = chonker2.Chonker2()
+    extractor.converter = object()  # keep Docling out of the test
+    data = extractor._result_to_json(pdf_path, SimpleNamespace(document=Document()),
+                                     tmp_path / "doc.json", 0.0)
+    
+    first, second = (item['bbox']['relative'] for item in data['items'])
+    assert first['x_ratio'] == 59.5 / 595.0
+    assert first['width_ratio'] == 238.0 / 595.0
+    assert first['height_ratio'] == 42.0 / 842.0
+    assert second['width_ratio'] == 238.0 / 612.0
+    assert second['height_ratio'] == 42.0 / 792.0